@@ -8,15 +8,16 @@ It creates and configures the Flask application using the application factory pa
 
 import os
 import sys
+from functools import lru_cache
 from typing import Optional
 
-try:
-    from traffic_app import create_app
-except ImportError as e:
-    print(f"Error importing traffic_app: {e}", file=sys.stderr)
-    sys.exit(1)
+_app = None
 
+# FLASK_DEBUG values that disable debug mode
+_FALSY = frozenset({'0', 'false', 'no', ''})
 
+
+@lru_cache(maxsize=1)
 def get_config_name() -> str:
     """Determine the configuration name based on environment variables."""
     # Check for explicit configuration override
@@ -29,17 +30,19 @@ def get_config_name() -> str:
     return flask_env
 
 
+@lru_cache(maxsize=2)
 def get_debug_mode(app_config_debug: bool) -> bool:
     """Determine debug mode with proper precedence."""
     # FLASK_DEBUG environment variable takes highest precedence
     flask_debug_env = os.environ.get('FLASK_DEBUG')
     if flask_debug_env is not None:
-        return flask_debug_env.lower() not in ('0', 'false', 'no', '')
+        return flask_debug_env.lower() not in _FALSY
     
     # Fall back to application configuration
     return app_config_debug
 
 
+@lru_cache(maxsize=1)
 def get_server_config() -> tuple[str, int]:
     """Get server host and port configuration."""
     host = os.environ.get('FLASK_RUN_HOST', '0.0.0.0')
@@ -60,6 +63,13 @@ def create_application(config_name: Optional[str] = None) -> 'Flask':
     if config_name is None:
         config_name = get_config_name()
     
+    # Imported here so that importing this module stays cheap until an app is needed
+    try:
+        from traffic_app import create_app
+    except ImportError as e:
+        print(f"Error importing traffic_app: {e}", file=sys.stderr)
+        sys.exit(1)
+    
     try:
         app = create_app(config_name)
         return app
@@ -68,11 +78,25 @@ def create_application(config_name: Optional[str] = None) -> 'Flask':
         sys.exit(1)
 
 
-# Create the application instance using the factory pattern
-app = create_application()
+def __getattr__(name: str):
+    """Create the application instance on first access to `app` or `application`.
+
+    WSGI servers and the Flask CLI look these attributes up with getattr(), so
+    the factory only runs when the app is actually served rather than on every
+    import of this module.
+    """
+    global _app
+    if name in ('app', 'application'):
+        if _app is None:
+            _app = create_application()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == '__main__':
+    # Create the application instance using the factory pattern
+    app = create_application()
+    
     # Get server configuration
     host, port = get_server_config()
     
@@ -95,10 +119,17 @@ if __name__ == '__main__':
     
     # Development-specific configurations
     if debug:
+        # Prefer the event-based watchdog reloader when installed; 'stat' polls every file
+        try:
+            import watchdog  # noqa: F401
+            reloader_type = 'watchdog'
+        except ImportError:
+            reloader_type = 'stat'
+        
         run_kwargs.update({
             'use_reloader': True,
             'extra_files': ['static/dist/output.css'],  # Watch for CSS changes
-            'reloader_type': 'stat',  # More reliable than watchdog on some systems
+            'reloader_type': reloader_type,
         })
     
     try:
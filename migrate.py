@@ -8,7 +8,8 @@ replacing hardcoded migration commands in render.yaml.
 import os
 import sys
 import logging
-import subprocess
+
+from flask_migrate import init as fm_init, migrate as fm_migrate, upgrade as fm_upgrade, stamp as fm_stamp
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -20,167 +21,109 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def run_command(command, description):
-    """Run a shell command with error handling."""
+def run_migration_step(step, description, **kwargs):
+    """Run a Flask-Migrate command in-process with error handling."""
+    root_logger = logging.getLogger()
+    root_handlers, root_level = root_logger.handlers[:], root_logger.level
     try:
         logger.info(f"{description}...")
-        result = subprocess.run(command, shell=True, capture_output=True, text=True)
-        
-        if result.stdout:
-            logger.info(f"Output: {result.stdout.strip()}")
-        
-        if result.returncode == 0:
-            logger.info(f"{description} completed successfully.")
-            return True
-        else:
-            logger.warning(f"{description} failed with return code {result.returncode}")
-            if result.stderr:
-                logger.warning(f"Error: {result.stderr.strip()}")
-            return False
+        try:
+            step(**kwargs)
+        finally:
+            # Alembic's env.py calls fileConfig(), which replaces the root handlers
+            # and disables existing loggers; restore ours for the remaining steps
+            root_logger.handlers[:] = root_handlers
+            root_logger.setLevel(root_level)
+            logger.disabled = False
+        logger.info(f"{description} completed successfully.")
+        return True
+    except SystemExit as e:
+        # Flask-Migrate reports command errors by calling sys.exit()
+        logger.warning(f"{description} failed with exit code {e.code}")
+        return False
     except Exception as e:
         logger.error(f"Exception during {description}: {e}")
         return False
 
 
 
-def fix_missing_columns():
+def get_missing_column_ddl(db):
+    """Return the ALTER TABLE statements needed to add missing columns.
+
+    PostgreSQL supports ALTER TABLE IF EXISTS ... ADD COLUMN IF NOT EXISTS, so
+    every fix is emitted and the database skips the ones already applied,
+    without a catalog lookup first. Other dialects (e.g. local SQLite) reflect
+    the tables and only emit statements for columns that are missing.
+    """
+    from sqlalchemy import inspect
+    from traffic_app.config import SCHEMA_COLUMN_FIXES
+
+    if db.engine.dialect.name == 'postgresql':
+        return [
+            f"ALTER TABLE IF EXISTS {table_name} ADD COLUMN IF NOT EXISTS {column_name} {column_definition};"
+            for table_name, column_name, column_definition in SCHEMA_COLUMN_FIXES
+        ]
+    
+    inspector = inspect(db.engine)
+    available_tables = inspector.get_table_names()
+    logger.info(f"Available tables: {available_tables}")
+    
+    ddl_statements = []
+    for table_name, column_name, column_definition in SCHEMA_COLUMN_FIXES:
+        if table_name not in available_tables:
+            # Tables are created by the migration revisions, so they are only reported here
+            logger.warning(f"{table_name.capitalize()} table not found. This might be a new database.")
+            continue
+        
+        if any(col['name'] == column_name for col in inspector.get_columns(table_name)):
+            logger.info(f"Column {column_name} already exists.")
+            continue
+        
+        logger.info(f"Adding missing {column_name} column...")
+        ddl_statements.append(
+            f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_definition};"
+        )
+    return ddl_statements
+
+def fix_missing_columns(app):
     """Automatically fix missing columns in the database."""
     logger.info("Checking for missing database columns...")
     try:
-        from traffic_app import create_app
         from traffic_app.extensions import db
-        from sqlalchemy import text, inspect
-        
-        app = create_app()
-        logger.info(f"App created successfully. Database URL: {app.config.get('SQLALCHEMY_DATABASE_URI', 'Not set')[:50]}...")
+        from sqlalchemy import text
         
         with app.app_context():
             logger.info("Entered app context for column fixes...")
-            # First ensure all tables exist
-            logger.info("Ensuring all tables exist...")
-            db.create_all()
+            # Collect the DDL for every missing column so it can be applied in one transaction
+            ddl_statements = get_missing_column_ddl(db)
             
-            inspector = inspect(db.engine)
-            table_names = inspector.get_table_names()
-            logger.info(f"Available tables: {table_names}")
-            
-            # Fix known issue with trip_assign_count column
-            if 'configuration' in table_names:
-                existing_columns = [col['name'] for col in inspector.get_columns('configuration')]
-                logger.info(f"Existing columns in configuration table: {existing_columns}")
-                
-                if 'trip_assign_count' not in existing_columns:
-                    logger.info("Adding missing trip_assign_count column...")
+            if ddl_statements:
+                try:
+                    if db.engine.dialect.name == 'postgresql':
+                        # psycopg2 sends a multi-statement string to the server in a
+                        # single round trip; the IF NOT EXISTS clauses keep it idempotent
+                        db.session.execute(text("\n".join(ddl_statements)))
+                    else:
+                        for add_column_sql in ddl_statements:
+                            db.session.execute(text(add_column_sql))
+                    db.session.commit()
+                    logger.info(f"Successfully applied {len(ddl_statements)} column fix(es).")
                     
-                    try:
-                        # Add the missing column with proper error handling
-                        add_column_sql = """
-                        ALTER TABLE configuration 
-                        ADD COLUMN trip_assign_count INTEGER DEFAULT 1 NOT NULL;
-                        """
-                        
-                        db.session.execute(text(add_column_sql))
-                        db.session.commit()
-                        
-                        logger.info("Successfully added trip_assign_count column.")
-                        
-                        # Verify the column was added
-                        inspector = inspect(db.engine)
-                        updated_columns = [col['name'] for col in inspector.get_columns('configuration')]
-                        if 'trip_assign_count' in updated_columns:
-                            logger.info("Column addition verified successfully.")
-                        else:
-                            logger.error("Column addition verification failed.")
-                            
-                    except Exception as col_error:
-                        logger.error(f"Failed to add trip_assign_count column: {col_error}")
-                        # Try alternative approach
-                        try:
-                            logger.info("Trying alternative column addition approach...")
-                            db.session.rollback()
-                            
-                            # Check if column exists using a different method
-                            check_sql = """
-                            SELECT column_name 
-                            FROM information_schema.columns 
-                            WHERE table_name = 'configuration' 
-                            AND column_name = 'trip_assign_count';
-                            """
-                            result = db.session.execute(text(check_sql)).fetchone()
-                            
-                            if not result:
-                                db.session.execute(text(add_column_sql))
-                                db.session.commit()
-                                logger.info("Successfully added column using alternative method.")
-                            else:
-                                logger.info("Column already exists (detected via information_schema).")
-                                
-                        except Exception as alt_error:
-                            logger.error(f"Alternative column addition also failed: {alt_error}")
-                            db.session.rollback()
-                else:
-                    logger.info("Column trip_assign_count already exists.")
-            else:
-                logger.warning("Configuration table not found. This might be a new database.")
-            
-            # Fix missing order_index column in scenario table
-            if 'scenario' in table_names:
-                existing_columns = [col['name'] for col in inspector.get_columns('scenario')]
-                logger.info(f"Existing columns in scenario table: {existing_columns}")
-                
-                if 'order_index' not in existing_columns:
-                    logger.info("Adding missing order_index column...")
+                except Exception as batch_error:
+                    logger.error(f"Failed to add missing columns in a single transaction: {batch_error}")
+                    db.session.rollback()
                     
-                    try:
-                        # Add the missing column with proper error handling
-                        add_column_sql = """
-                        ALTER TABLE scenario 
-                        ADD COLUMN order_index INTEGER DEFAULT 0 NOT NULL;
-                        """
-                        
-                        db.session.execute(text(add_column_sql))
-                        db.session.commit()
-                        
-                        logger.info("Successfully added order_index column.")
-                        
-                        # Verify the column was added
-                        inspector = inspect(db.engine)
-                        updated_columns = [col['name'] for col in inspector.get_columns('scenario')]
-                        if 'order_index' in updated_columns:
-                            logger.info("order_index column addition verified successfully.")
-                        else:
-                            logger.error("order_index column addition verification failed.")
-                            
-                    except Exception as col_error:
-                        logger.error(f"Failed to add order_index column: {col_error}")
-                        # Try alternative approach
+                    # Fall back to applying each statement on its own so one failure
+                    # (e.g. a column added concurrently) doesn't block the others
+                    logger.info("Trying alternative column addition approach...")
+                    for add_column_sql in ddl_statements:
                         try:
-                            logger.info("Trying alternative order_index column addition approach...")
-                            db.session.rollback()
-                            
-                            # Check if column exists using a different method
-                            check_sql = """
-                            SELECT column_name 
-                            FROM information_schema.columns 
-                            WHERE table_name = 'scenario' 
-                            AND column_name = 'order_index';
-                            """
-                            result = db.session.execute(text(check_sql)).fetchone()
-                            
-                            if not result:
-                                db.session.execute(text(add_column_sql))
-                                db.session.commit()
-                                logger.info("Successfully added order_index column using alternative method.")
-                            else:
-                                logger.info("order_index column already exists (detected via information_schema).")
-                                
+                            db.session.execute(text(add_column_sql))
+                            db.session.commit()
+                            logger.info(f"Successfully applied: {add_column_sql.strip()}")
                         except Exception as alt_error:
-                            logger.error(f"Alternative order_index column addition also failed: {alt_error}")
+                            logger.error(f"Alternative column addition also failed: {alt_error}")
                             db.session.rollback()
-                else:
-                    logger.info("Column order_index already exists.")
-            else:
-                logger.warning("Scenario table not found. This might be a new database.")
             
             return True
             
@@ -190,38 +133,117 @@ def fix_missing_columns():
         logger.error(f"Traceback: {traceback.format_exc()}")
         return False
 
-def setup_flask_migrate():
-    """Set up and run Flask-Migrate operations."""
-    os.environ['FLASK_APP'] = 'app.py'
-    logger.info("Starting Flask-Migrate setup for Render deployment...")
+def dedupe_configuration_names(app):
+    """Rename duplicate configuration names within a study.
+
+    Configuration names are unique per study (uq_configuration_study_id_name),
+    but older releases allowed duplicates, and the upgrade that adds the
+    constraint fails on them. The oldest configuration keeps its name; later
+    ones get their id appended, e.g. 'Base' -> 'Base (42)'.
+    """
+    logger.info("Checking for duplicate configuration names...")
+    try:
+        from traffic_app.extensions import db
+        from sqlalchemy import inspect, text
+        
+        with app.app_context():
+            if 'configuration' not in inspect(db.engine).get_table_names():
+                return True
+            
+            rows = db.session.execute(
+                text("SELECT id, study_id, name FROM configuration ORDER BY study_id, id")
+            ).all()
+            names_by_study = {}
+            for config_id, study_id, name in rows:
+                names_by_study.setdefault(study_id, []).append(name)
+            
+            renames = []
+            seen_by_study = {}
+            for config_id, study_id, name in rows:
+                seen = seen_by_study.setdefault(study_id, set())
+                if name in seen:
+                    taken = seen.union(names_by_study[study_id])
+                    suffix = f" ({config_id})"
+                    new_name = name[:100 - len(suffix)] + suffix
+                    counter = 2
+                    while new_name in taken:
+                        suffix = f" ({config_id}-{counter})"
+                        new_name = name[:100 - len(suffix)] + suffix
+                        counter += 1
+                    renames.append({'id': config_id, 'name': new_name})
+                    logger.info(f"Renaming duplicate configuration {config_id} in study {study_id}: '{name}' -> '{new_name}'")
+                    name = new_name
+                seen.add(name)
+            
+            if renames:
+                db.session.execute(text("UPDATE configuration SET name = :name WHERE id = :id"), renames)
+                db.session.commit()
+                logger.info(f"Renamed {len(renames)} duplicate configuration name(s).")
+            return True
+            
+    except Exception as e:
+        logger.error(f"Configuration name de-duplication failed: {e}")
+        return False
 
-    from traffic_app import create_app
-    from traffic_app.extensions import db
+def is_database_at_head(app, directory):
+    """Check whether the database revision matches the head of the migrations directory."""
+    try:
+        from alembic.config import Config as AlembicConfig
+        from alembic.migration import MigrationContext
+        from alembic.script import ScriptDirectory
+        from traffic_app.extensions import db
+        
+        alembic_cfg = AlembicConfig()
+        alembic_cfg.set_main_option('script_location', directory)
+        head = ScriptDirectory.from_config(alembic_cfg).get_current_head()
+        
+        with app.app_context(), db.engine.connect() as conn:
+            current = MigrationContext.configure(conn).get_current_revision()
+        
+        logger.info(f"Database revision: {current}, migrations head: {head}")
+        return current == head
+        
+    except Exception as e:
+        # e.g. multiple heads; let the upgrade step deal with it
+        logger.warning(f"Could not compare database revision with migrations head: {e}")
+        return False
 
-    app = create_app()
+def setup_flask_migrate(app):
+    """Set up and run Flask-Migrate operations.
+    
+    Returns True once the database is at the latest revision, False if a step
+    needed to get it there failed.
+    """
+    logger.info("Starting Flask-Migrate setup for Render deployment...")
     
     # First, try to fix any missing columns
-    fix_missing_columns()
+    fix_missing_columns(app)
     
-    if not os.path.exists('migrations'):
-        logger.info("Migrations directory not found. Initializing...")
-        with app.app_context():
-            # First create all tables for initial setup
-            logger.info("Creating all database tables for initial setup...")
-            db.create_all()
-            logger.info("Database tables created.")
-        
-        run_command('flask db init', 'Initialize Flask-Migrate')
-        run_command('flask db stamp head', 'Stamp database as current')
-    else:
-        logger.info("Migrations directory found. Running migrations...")
-        run_command('flask db migrate -m "Auto-detecting schema changes"', 'Auto-detect migrations')
-        run_command('flask db upgrade', 'Apply database migrations')
+    # Existing duplicates would make the upgrade adding the unique constraint fail
+    if not dedupe_configuration_names(app):
+        return False
     
-    # Always try to detect and apply any new changes
-    logger.info("Checking for additional schema changes...")
-    run_command('flask db migrate -m "Add missing columns"', 'Detect missing columns')
-    run_command('flask db upgrade', 'Apply any pending migrations')
+    with app.app_context():
+        if not os.path.exists('migrations'):
+            logger.info("Migrations directory not found. Initializing...")
+            if not run_migration_step(fm_init, 'Initialize Flask-Migrate', directory='migrations'):
+                return False
+            if not run_migration_step(fm_stamp, 'Stamp database as current', revision='head'):
+                return False
+        else:
+            logger.info("Migrations directory found. Running migrations...")
+        
+        # Detect and apply any schema changes in a single autogenerate/upgrade pass;
+        # on a new database this also creates the tables
+        logger.info("Checking for schema changes...")
+        run_migration_step(fm_migrate, 'Auto-detect migrations', message='Auto-detecting schema changes')
+        
+        # Most deploys change no models, leaving the database already at head
+        if is_database_at_head(app, 'migrations'):
+            logger.info("Database is already at the latest revision. Skipping upgrade.")
+            return True
+        
+        return run_migration_step(fm_upgrade, 'Apply database migrations')
 
 def main():
     """Main migration function."""
@@ -230,19 +252,35 @@ def main():
     logger.info(f"Current working directory: {os.getcwd()}")
     logger.info(f"Environment variables: FLASK_APP={os.environ.get('FLASK_APP', 'Not set')}")
     
+    # Flask-Migrate is only registered by create_app when asked for; set before
+    # traffic_app.config is imported, since it reads the flag at import time
+    os.environ.setdefault('ENABLE_MIGRATIONS', 'true')
+    
     try:
-        success = setup_flask_migrate()
+        from sqlalchemy.pool import NullPool
+        from traffic_app import create_app
+        
+        # Build the app once and share it with every migration step. A one-shot
+        # process gains nothing from a connection pool; NullPool closes each
+        # connection as soon as it is returned, so nothing lingers at exit.
+        # create_app drops the config's pool-only options (QUEUEPOOL_ONLY_KEYS) for it
+        app = create_app(engine_options={'poolclass': NullPool})
+        logger.info(f"App created successfully. Database URL: {app.config.get('SQLALCHEMY_DATABASE_URI', 'Not set')[:50]}...")
+        
+        success = setup_flask_migrate(app)
         if success:
             logger.info("=== MIGRATION PROCESS COMPLETED SUCCESSFULLY ===")
             sys.exit(0)
         else:
-            logger.warning("=== MIGRATION PROCESS COMPLETED WITH WARNINGS ===")
-            sys.exit(0)
+            # The schema is not at head; deploying now would run the app against stale tables
+            logger.error("=== MIGRATION PROCESS FAILED: database is not at the latest revision ===")
+            sys.exit(1)
     except Exception as e:
         logger.error(f"=== MIGRATION PROCESS FAILED: {e} ===")
         import traceback
         logger.error(f"Traceback: {traceback.format_exc()}")
-        sys.exit(0)
+        # Fail the build rather than deploy against an unmigrated schema
+        sys.exit(1)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
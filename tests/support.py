@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+
+
+class TempDatabaseTestCase(unittest.TestCase):
+    """Points DATABASE_URL at a fresh SQLite file in a temporary directory for each test."""
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.tmp_path = self._tmpdir.name
+        self._env = {
+            'SECRET_KEY': 'test-secret',
+            'DATABASE_URL': f"sqlite:///{os.path.join(self.tmp_path, 'test.db')}",
+        }
+        self._saved_env = {key: os.environ.get(key) for key in self._env}
+        os.environ.update(self._env)
+
+        from traffic_app.config import Config
+        Config.get_database_settings.cache_clear()
+
+    def tearDown(self):
+        for key, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        from traffic_app.config import Config
+        Config.get_database_settings.cache_clear()
+        self._tmpdir.cleanup()
+
+
+class AppTestCase(TempDatabaseTestCase):
+    """A testing app on its own database, with uploads and outputs kept in the temporary directory."""
+
+    def setUp(self):
+        super().setUp()
+        from traffic_app import create_app
+        from traffic_app.extensions import db
+
+        self.app = create_app('testing')
+        self.app.config.update(
+            BASE_DIR=self.tmp_path,
+            UPLOAD_FOLDER=os.path.join(self.tmp_path, 'uploads'),
+            OUTPUT_FOLDER=os.path.join(self.tmp_path, 'outputs'),
+        )
+        self.client = self.app.test_client()
+        self.db = db
+        self._ctx = self.app.app_context()
+        self._ctx.push()
+
+    def tearDown(self):
+        self.db.session.remove()
+        self.db.engine.dispose()
+        self._ctx.pop()
+        super().tearDown()
+
+    def create_study(self, name='Study', analyst_name='Analyst'):
+        response = self.client.post('/api/studies', json={'name': name, 'analyst_name': analyst_name})
+        self.assertEqual(response.status_code, 201, response.get_json())
+        return response.get_json()['study_id']
+
+    def configure(self, study_id, **body):
+        body.setdefault('config_name', 'Config')
+        body.setdefault('phases_n', 1)
+        return self.client.post(f'/api/studies/{study_id}/configure', json=body)
@@ -0,0 +1,100 @@
+import unittest
+
+from sqlalchemy import select
+
+from support import AppTestCase
+
+
+class ConfigureStudyTest(AppTestCase):
+    """POST /configure creates a configuration and inserts its scenarios in one batch."""
+
+    def setUp(self):
+        super().setUp()
+        self.study_id = self.create_study()
+
+    def test_scenarios_are_created_in_order_with_their_ids(self):
+        from traffic_app.models import Scenario
+
+        response = self.configure(
+            self.study_id, phases_n=2, include_bg_dist=True,
+            include_trip_dist=True, trip_dist_count=2,
+        )
+
+        self.assertEqual(response.status_code, 200, response.get_json())
+        data = response.get_json()
+        self.assertEqual([s['name'] for s in data['scenarios']], [
+            'Existing',
+            'No_Build_Phase_1', 'Build_Phase_1', 'BG_Dev_Distribution_Phase_1',
+            'Trip_Distribution_1_Phase_1', 'Trip_Distribution_2_Phase_1',
+            'No_Build_Phase_2', 'Build_Phase_2', 'BG_Dev_Distribution_Phase_2',
+            'Trip_Distribution_1_Phase_2', 'Trip_Distribution_2_Phase_2',
+        ])
+        self.assertEqual({s['status'] for s in data['scenarios']}, {'PENDING_FILES'})
+
+        rows = self.db.session.execute(
+            select(Scenario.id, Scenario.name, Scenario.study_id, Scenario.configuration_id)
+            .order_by(Scenario.id)
+        ).all()
+        self.assertEqual([(row.id, row.name) for row in rows], [(s['id'], s['name']) for s in data['scenarios']])
+        self.assertEqual({(row.study_id, row.configuration_id) for row in rows}, {(self.study_id, data['configuration']['id'])})
+
+    def test_duplicate_name_is_rejected(self):
+        self.assertEqual(self.configure(self.study_id, config_name='Same').status_code, 200)
+
+        response = self.configure(self.study_id, config_name='Same')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('already exists', response.get_json()['error'])
+
+    def test_unknown_study_is_404(self):
+        self.assertEqual(self.configure(self.study_id + 1).status_code, 404)
+
+
+class ParseConfigurationRequestTest(AppTestCase):
+    """Malformed configure bodies are rejected with a 400 before anything is written."""
+
+    def setUp(self):
+        super().setUp()
+        self.study_id = self.create_study()
+
+    def assert_rejected(self, body, message):
+        response = self.client.post(f'/api/studies/{self.study_id}/configure', json=body)
+        self.assertEqual(response.status_code, 400, response.get_json())
+        self.assertIn(message, response.get_json()['error'])
+
+    def test_missing_fields(self):
+        self.assert_rejected({'config_name': 'C'}, "'phases_n' and 'config_name' required")
+        self.assert_rejected({'phases_n': 1}, "'phases_n' and 'config_name' required")
+
+    def test_invalid_phases_n(self):
+        for phases_n in ('two', -1, None, [1]):
+            with self.subTest(phases_n=phases_n):
+                self.assert_rejected({'phases_n': phases_n, 'config_name': 'C'}, "Invalid 'phases_n'")
+
+    def test_blank_or_non_string_config_name(self):
+        for config_name in ('', '   ', 5, None):
+            with self.subTest(config_name=config_name):
+                self.assert_rejected({'phases_n': 1, 'config_name': config_name}, "'config_name' cannot be empty")
+
+    def test_flags_and_counts(self):
+        from traffic_app.utils import parse_configuration_request
+
+        fields, error = parse_configuration_request({
+            'phases_n': '2', 'config_name': ' C ',
+            'include_bg_dist': 'true', 'include_trip_dist': True, 'trip_dist_count': 3,
+            'trip_assign_count': 4,
+        })
+
+        self.assertIsNone(error)
+        self.assertEqual(fields['name'], 'C')
+        self.assertEqual(fields['phases_n'], 2)
+        # Only a JSON true turns a flag on
+        self.assertFalse(fields['include_bg_dist'])
+        self.assertTrue(fields['include_trip_dist'])
+        self.assertEqual(fields['trip_dist_count'], 3)
+        # Counts of scenario types that are not included fall back to 1
+        self.assertEqual(fields['trip_assign_count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import unittest
+
+from sqlalchemy import func, select, update
+
+from support import AppTestCase
+
+
+class BulkDeleteTest(AppTestCase):
+    """Deleting a configuration or study removes exactly its rows and files, with bulk DELETEs."""
+
+    def setUp(self):
+        super().setUp()
+        self.study_id = self.create_study('Study')
+        self.other_study_id = self.create_study('Other')
+        self.config_ids = [
+            self.configure(self.study_id, config_name=name).get_json()['configuration']['id']
+            for name in ('A', 'B')
+        ]
+        self.other_config_id = self.configure(self.other_study_id, config_name='A').get_json()['configuration']['id']
+
+    def _count(self, model, **filters):
+        query = select(func.count()).select_from(model)
+        for column, value in filters.items():
+            query = query.where(getattr(model, column) == value)
+        return self.db.session.execute(query).scalar()
+
+    def _link_upload(self, config_id):
+        """Give the first scenario of a configuration an uploaded file on disk; returns its path."""
+        from traffic_app.models import Scenario
+
+        scenario_id = self.db.session.execute(
+            select(Scenario.id).where(Scenario.configuration_id == config_id).order_by(Scenario.id)
+        ).scalars().first()
+        relative_path = os.path.join('uploads', f'{scenario_id}_am.csv')
+        absolute_path = os.path.join(self.tmp_path, relative_path)
+        os.makedirs(os.path.dirname(absolute_path), exist_ok=True)
+        with open(absolute_path, 'w') as f:
+            f.write('x')
+        self.db.session.execute(update(Scenario).where(Scenario.id == scenario_id).values(am_csv_path=relative_path))
+        self.db.session.commit()
+        return absolute_path
+
+    def test_delete_configuration(self):
+        from traffic_app.models import Configuration, Scenario
+
+        deleted_file = self._link_upload(self.config_ids[0])
+        kept_file = self._link_upload(self.config_ids[1])
+        scenarios_per_config = self._count(Scenario, configuration_id=self.config_ids[0])
+
+        response = self.client.delete(f'/api/studies/{self.study_id}/configurations/{self.config_ids[0]}')
+
+        self.assertEqual(response.status_code, 200, response.get_json())
+        self.assertIn(f'{scenarios_per_config} associated scenarios', response.get_json()['message'])
+        self.assertEqual(response.get_json()['files_deleted']['uploads'], 1)
+        self.assertEqual(response.get_json()['files_deleted']['empty_folders_removed'], 0)
+        self.assertIsNone(self.db.session.get(Configuration, self.config_ids[0]))
+        self.assertEqual(self._count(Scenario, configuration_id=self.config_ids[0]), 0)
+        self.assertEqual(self._count(Scenario, configuration_id=self.config_ids[1]), scenarios_per_config)
+        self.assertFalse(os.path.exists(deleted_file))
+        self.assertTrue(os.path.exists(kept_file))
+
+    def test_delete_configuration_of_another_study_is_404(self):
+        from traffic_app.models import Scenario
+
+        response = self.client.delete(f'/api/studies/{self.study_id}/configurations/{self.other_config_id}')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertGreater(self._count(Scenario, configuration_id=self.other_config_id), 0)
+
+    def test_delete_study(self):
+        from traffic_app.models import Configuration, Scenario, Study
+
+        deleted_file = self._link_upload(self.config_ids[1])
+        kept_file = self._link_upload(self.other_config_id)
+        other_scenarios = self._count(Scenario, study_id=self.other_study_id)
+
+        response = self.client.delete(f'/api/studies/{self.study_id}')
+
+        self.assertEqual(response.status_code, 200, response.get_json())
+        self.assertEqual(sorted(response.get_json()['files_deleted']['configurations_deleted']), sorted(self.config_ids))
+        self.assertIsNone(self.db.session.get(Study, self.study_id))
+        self.assertEqual(self._count(Configuration, study_id=self.study_id), 0)
+        self.assertEqual(self._count(Scenario, study_id=self.study_id), 0)
+        self.assertEqual(self._count(Configuration, study_id=self.other_study_id), 1)
+        self.assertEqual(self._count(Scenario, study_id=self.other_study_id), other_scenarios)
+        self.assertFalse(os.path.exists(deleted_file))
+        self.assertTrue(os.path.exists(kept_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
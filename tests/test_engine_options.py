@@ -0,0 +1,34 @@
+import unittest
+
+from sqlalchemy.pool import NullPool
+
+from support import TempDatabaseTestCase
+
+
+class ProductionNullPoolTest(TempDatabaseTestCase):
+    """migrate.py builds the production app with NullPool; the pool-only options must not reach create_engine."""
+
+    def test_production_app_with_nullpool_creates_engine(self):
+        from traffic_app import create_app
+        from traffic_app.config import ProductionConfig, QUEUEPOOL_ONLY_KEYS
+        from traffic_app.extensions import db
+
+        # Cloudinary credentials are not part of this test
+        use_cloudinary = ProductionConfig.USE_CLOUDINARY
+        ProductionConfig.USE_CLOUDINARY = False
+        try:
+            app = create_app('production', engine_options={'poolclass': NullPool})
+        finally:
+            ProductionConfig.USE_CLOUDINARY = use_cloudinary
+
+        engine_options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+        for key in QUEUEPOOL_ONLY_KEYS:
+            self.assertNotIn(key, engine_options)
+        with app.app_context():
+            self.assertIsInstance(db.engine.pool, NullPool)
+            with db.engine.connect() as conn:
+                self.assertEqual(conn.exec_driver_sql('SELECT 1').scalar(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
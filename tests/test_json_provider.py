@@ -0,0 +1,83 @@
+import dataclasses
+import decimal
+import json
+import unittest
+import uuid
+from datetime import date, datetime
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from markupsafe import Markup
+
+from traffic_app.json_provider import OrjsonProvider
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+    y: int
+
+
+# Unsorted keys and every type Flask's default provider converts
+PAYLOAD = {
+    'b': 1,
+    'a': [datetime(2024, 1, 2, 3, 4, 5), date(2024, 1, 2)],
+    'decimal': decimal.Decimal('1.50'),
+    'uuid': uuid.UUID(int=5),
+    'point': Point(1, 2),
+    'markup': Markup('<b>bold</b>'),
+    'nested': {'z': None, 'y': [1.5, True, 'text']},
+}
+
+
+class OrjsonProviderParityTest(unittest.TestCase):
+    """OrjsonProvider must produce what Flask's default provider does."""
+
+    def providers(self, debug=False):
+        app = Flask(__name__)
+        app.debug = debug
+        return app, DefaultJSONProvider(app), OrjsonProvider(app)
+
+    def test_response_body_matches_flask(self):
+        for debug in (False, True):
+            with self.subTest(debug=debug):
+                app, flask_json, orjson_json = self.providers(debug)
+                with app.app_context():
+                    expected = flask_json.response(PAYLOAD)
+                    actual = orjson_json.response(PAYLOAD)
+                self.assertEqual(actual.get_data(), expected.get_data())
+                self.assertEqual(actual.mimetype, expected.mimetype)
+
+    def test_non_ascii_text_decodes_to_the_same_value(self):
+        # orjson writes UTF-8 where Flask escapes to \uXXXX; the JSON value is the same
+        app, flask_json, orjson_json = self.providers()
+        payload = {'name': 'Ünïcode – test'}
+        with app.app_context():
+            expected = flask_json.response(payload).get_data()
+            actual = orjson_json.response(payload).get_data()
+        self.assertEqual(json.loads(actual), json.loads(expected))
+
+    def test_dumps_and_loads_round_trip(self):
+        app, flask_json, orjson_json = self.providers()
+        self.assertEqual(json.loads(orjson_json.dumps(PAYLOAD)), json.loads(flask_json.dumps(PAYLOAD)))
+        self.assertEqual(orjson_json.loads('{"a": [1, 2]}'), {'a': [1, 2]})
+        self.assertEqual(orjson_json.loads(b'{"a": [1, 2]}'), {'a': [1, 2]})
+
+    def test_keyword_arguments_are_honoured(self):
+        app, flask_json, orjson_json = self.providers()
+        for kwargs in ({'indent': 4}, {'separators': (',', ':')}, {'sort_keys': False}):
+            with self.subTest(kwargs=kwargs):
+                self.assertEqual(orjson_json.dumps(PAYLOAD, **kwargs), flask_json.dumps(PAYLOAD, **kwargs))
+        self.assertEqual(
+            orjson_json.loads('{"n": 1.25}', parse_float=decimal.Decimal),
+            {'n': decimal.Decimal('1.25')},
+        )
+
+    def test_unsupported_type_raises_type_error(self):
+        app, flask_json, orjson_json = self.providers()
+        with self.assertRaises(TypeError):
+            orjson_json.dumps({'value': object()})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import sqlite3
+import unittest
+
+from support import TempDatabaseTestCase
+
+
+class DedupeConfigurationNamesTest(TempDatabaseTestCase):
+    """migrate.py renames duplicate configuration names before the unique constraint is added."""
+
+    def setUp(self):
+        super().setUp()
+        # A configuration table from before uq_configuration_study_id_name, holding duplicates
+        self.db_path = os.path.join(self.tmp_path, 'test.db')
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("CREATE TABLE configuration (id INTEGER PRIMARY KEY, study_id INTEGER, name VARCHAR(100))")
+            conn.executemany("INSERT INTO configuration (id, study_id, name) VALUES (?, ?, ?)", [
+                (1, 1, 'Base'),
+                (2, 1, 'Base'),
+                (3, 1, 'Base (3)'),
+                (4, 1, 'Base'),
+                (5, 2, 'Base'),
+                (6, 1, 'X' * 100),
+                (7, 1, 'X' * 100),
+            ])
+
+    def names(self):
+        with sqlite3.connect(self.db_path) as conn:
+            return dict(conn.execute("SELECT id, name FROM configuration"))
+
+    def test_duplicates_are_renamed(self):
+        import migrate
+        from traffic_app import create_app
+
+        app = create_app('testing')
+        try:
+            self.assertTrue(migrate.dedupe_configuration_names(app))
+        finally:
+            with app.app_context():
+                from traffic_app.extensions import db
+                db.engine.dispose()
+
+        self.assertEqual(self.names(), {
+            1: 'Base',
+            2: 'Base (2)',
+            # 'Base (3)' was already taken by configuration 3 itself
+            3: 'Base (3)',
+            4: 'Base (4)',
+            # Names only need to be unique within a study
+            5: 'Base',
+            6: 'X' * 100,
+            7: 'X' * 96 + ' (7)',
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
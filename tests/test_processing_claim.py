@@ -0,0 +1,95 @@
+import os
+import unittest
+from unittest import mock
+
+from sqlalchemy import update
+
+from support import AppTestCase
+
+
+class ProcessingClaimTest(AppTestCase):
+    """A scenario is claimed for processing with one committed, conditional UPDATE."""
+
+    def setUp(self):
+        super().setUp()
+        from traffic_app.models import Scenario, ProcessingStatus
+
+        study_id = self.create_study()
+        scenario_id = self.configure(study_id).get_json()['scenarios'][0]['id']
+        # Link input files that exist on disk, so processing gets as far as the claim
+        paths = {}
+        for column in ('am_csv_path', 'pm_csv_path', 'attout_txt_path'):
+            paths[column] = os.path.join('uploads', f'{column}.txt')
+            os.makedirs(os.path.join(self.tmp_path, 'uploads'), exist_ok=True)
+            with open(os.path.join(self.tmp_path, paths[column]), 'w') as f:
+                f.write('x')
+        self.db.session.execute(
+            update(Scenario).where(Scenario.id == scenario_id)
+            .values(status=ProcessingStatus.READY_TO_PROCESS, **paths)
+        )
+        self.db.session.commit()
+        self.study_id, self.scenario_id = study_id, scenario_id
+        self.process_url = f'/api/studies/{study_id}/scenarios/{scenario_id}/process'
+
+    def _status_in_db(self):
+        """Read the committed status through a separate connection."""
+        from traffic_app.models import Scenario
+
+        with self.db.engine.connect() as conn:
+            return conn.execute(Scenario.__table__.select().where(Scenario.id == self.scenario_id)).one().status
+
+    def test_claim_fails_once_another_request_has_claimed(self):
+        from traffic_app.models import Scenario, ProcessingStatus
+        from traffic_app.utils import claim_scenario_for_processing
+
+        # This request has read the scenario as READY_TO_PROCESS ...
+        scenario = self.db.session.get(Scenario, self.scenario_id)
+        self.assertEqual(scenario.status, ProcessingStatus.READY_TO_PROCESS)
+        # ... when another request claims it first
+        with self.db.engine.begin() as conn:
+            conn.execute(
+                update(Scenario).where(Scenario.id == self.scenario_id)
+                .values(status=ProcessingStatus.PROCESSING)
+            )
+
+        self.assertFalse(claim_scenario_for_processing(scenario))
+
+    def test_claim_is_committed_before_processing_starts(self):
+        from traffic_app.models import ProcessingStatus
+
+        statuses_seen = []
+
+        def fake_process(am_path, pm_path, attout_path, output_dir, scenario_name):
+            statuses_seen.append(self._status_in_db())
+            os.makedirs(output_dir, exist_ok=True)
+            merged, attin = os.path.join(output_dir, 'merged.csv'), os.path.join(output_dir, 'attin.txt')
+            for path in (merged, attin):
+                open(path, 'w').close()
+            return merged, attin
+
+        with mock.patch('traffic_app.processing.process_traffic_data', fake_process):
+            response = self.client.post(self.process_url)
+
+        self.assertEqual(response.status_code, 200, response.get_json())
+        self.assertEqual(statuses_seen, [ProcessingStatus.PROCESSING])
+        self.assertEqual(self._status_in_db(), ProcessingStatus.COMPLETE)
+
+    def test_process_rejects_scenario_already_processing(self):
+        with mock.patch('traffic_app.routes.api.claim_scenario_for_processing', return_value=False):
+            response = self.client.post(self.process_url)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('already being processed', response.get_json()['error'])
+
+    def test_failed_claim_leaves_status_unchanged(self):
+        from traffic_app.models import ProcessingStatus
+
+        with mock.patch('traffic_app.routes.api.claim_scenario_for_processing', side_effect=RuntimeError('database is locked')):
+            response = self.client.post(self.process_url)
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(self._status_in_db(), ProcessingStatus.READY_TO_PROCESS)
+
+
+if __name__ == '__main__':
+    unittest.main()
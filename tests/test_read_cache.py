@@ -0,0 +1,81 @@
+import unittest
+from unittest import mock
+
+from flask import Flask
+
+from traffic_app.cache import cached_read, invalidate_read_cache
+
+
+class CachedReadTest(unittest.TestCase):
+    """cached_read keeps successful (data, error) results for API_CACHE_TTL seconds."""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(API_CACHE_TTL=30, API_CACHE_STALE_TTL=300)
+        self.results = []
+        self.calls = 0
+
+        @cached_read
+        def read_items(study_id):
+            self.calls += 1
+            return self.results.pop(0)
+
+        self.read_items = read_items
+        self._ctx = self.app.app_context()
+        self._ctx.push()
+        self.now = 1000.0
+        patcher = mock.patch('traffic_app.cache.time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self._ctx.pop()
+
+    def test_disabled_when_ttl_is_zero(self):
+        self.app.config['API_CACHE_TTL'] = 0
+        self.results = [(['a'], None), (['b'], None)]
+        self.assertEqual(self.read_items(1), (['a'], None))
+        self.assertEqual(self.read_items(1), (['b'], None))
+
+    def test_hit_within_ttl_returns_a_copy(self):
+        self.results = [(['a'], None)]
+        data, error = self.read_items(1)
+        data.append('modified by caller')
+
+        self.assertEqual(self.read_items(1), (['a'], None))
+        self.assertEqual(self.calls, 1)
+
+    def test_arguments_are_part_of_the_key(self):
+        self.results = [(['one'], None), (['two'], None)]
+        self.assertEqual(self.read_items(1), (['one'], None))
+        self.assertEqual(self.read_items(2), (['two'], None))
+
+    def test_refreshed_after_ttl(self):
+        self.results = [(['a'], None), (['b'], None)]
+        self.read_items(1)
+        self.now += 31
+        self.assertEqual(self.read_items(1), (['b'], None))
+
+    def test_errors_are_not_cached(self):
+        self.results = [([], 'boom'), (['a'], None)]
+        self.assertEqual(self.read_items(1), ([], 'boom'))
+        self.assertEqual(self.read_items(1), (['a'], None))
+
+    def test_failed_refresh_serves_stale_result(self):
+        self.results = [(['a'], None), ([], 'boom'), ([], 'boom')]
+        self.read_items(1)
+        self.now += 31
+        self.assertEqual(self.read_items(1), (['a'], None))
+        # Too old to serve once API_CACHE_STALE_TTL has passed
+        self.now += 300
+        self.assertEqual(self.read_items(1), ([], 'boom'))
+
+    def test_invalidate_drops_cached_results(self):
+        self.results = [(['a'], None), (['b'], None)]
+        self.read_items(1)
+        invalidate_read_cache()
+        self.assertEqual(self.read_items(1), (['b'], None))
+
+
+if __name__ == '__main__':
+    unittest.main()
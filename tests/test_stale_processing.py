@@ -0,0 +1,80 @@
+import unittest
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from support import AppTestCase
+
+
+class StaleProcessingTest(AppTestCase):
+    """Scenarios left in PROCESSING by a dead worker, and late results from old runs."""
+
+    def setUp(self):
+        super().setUp()
+        self.study_id = self.create_study()
+        self.scenario_id = self.configure(self.study_id).get_json()['scenarios'][0]['id']
+        self.status_url = f'/api/studies/{self.study_id}/scenarios/{self.scenario_id}/status'
+
+    def _set_processing(self, started_at):
+        from traffic_app.models import Scenario, ProcessingStatus
+
+        self.db.session.execute(
+            update(Scenario).where(Scenario.id == self.scenario_id)
+            .values(status=ProcessingStatus.PROCESSING, processing_started_at=started_at)
+        )
+        self.db.session.commit()
+
+    def _scenario(self):
+        from traffic_app.models import Scenario
+
+        self.db.session.expire_all()
+        return self.db.session.get(Scenario, self.scenario_id)
+
+    def test_recent_processing_is_reported_as_processing(self):
+        self._set_processing(datetime.utcnow())
+        self.assertEqual(self.client.get(self.status_url).get_json()['status'], 'PROCESSING')
+
+    def test_stale_processing_is_reported_as_error_without_writing(self):
+        from traffic_app.models import ProcessingStatus
+
+        timeout = self.app.config['PROCESSING_TIMEOUT']
+        self._set_processing(datetime.utcnow() - timedelta(seconds=timeout + 60))
+
+        data = self.client.get(self.status_url).get_json()
+
+        self.assertEqual(data['status'], 'ERROR')
+        self.assertEqual(self._scenario().status, ProcessingStatus.PROCESSING)
+
+    def test_process_fails_stale_run_before_reprocessing(self):
+        from traffic_app.models import ProcessingStatus
+
+        self._set_processing(None)
+
+        response = self.client.post(self.status_url.replace('/status', '/process'))
+
+        # Past the status check; rejected only because no input files are linked
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Missing required file paths', response.get_json()['error'])
+        self.assertEqual(self._scenario().status, ProcessingStatus.ERROR)
+
+    def test_late_background_result_does_not_overwrite_newer_run(self):
+        from traffic_app.models import ProcessingStatus
+        from traffic_app.utils import _record_processing_result
+
+        started_at = datetime.utcnow()
+        self._set_processing(started_at)
+        old_run = Future()
+        old_run.set_exception(RuntimeError('old run failed'))
+
+        _record_processing_result(self.app, self.study_id, self.scenario_id, started_at - timedelta(hours=1), old_run)
+        self.assertEqual(self._scenario().status, ProcessingStatus.PROCESSING)
+
+        _record_processing_result(self.app, self.study_id, self.scenario_id, started_at, old_run)
+        scenario = self._scenario()
+        self.assertEqual(scenario.status, ProcessingStatus.ERROR)
+        self.assertEqual(scenario.status_message, 'Processing failed: old run failed')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,116 +1,270 @@
 import os
+import sys
+import time
 import logging
-from datetime import datetime
+import logging.config
+from functools import lru_cache
+from types import MappingProxyType
 from flask import Flask
+from flask import Config as FlaskConfig
+from sqlalchemy import text
+from sqlalchemy.pool import NullPool
+from .json_provider import OrjsonProvider
+
+__all__ = ['create_app', 'bootstrap_schema']
+
+# Set once the root logger has been configured, so repeated create_app calls don't redo it
+_LOGGING_CONFIGURED = False
+
+def _configure_logging(app):
+    """Configure root logging from the app config, once per process."""
+    global _LOGGING_CONFIGURED
+    if _LOGGING_CONFIGURED:
+        return
+    
+    logging.config.dictConfig({
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'default': {
+                'format': app.config.get('LOGGING_FORMAT', '%(asctime)s - %(levelname)s - %(message)s')
+            }
+        },
+        'handlers': {
+            'console': {
+                'class': 'logging.StreamHandler',
+                'formatter': 'default'
+            }
+        },
+        'root': {
+            'level': app.config.get('LOGGING_LEVEL', 'INFO'),
+            'handlers': ['console']
+        }
+    })
+    _LOGGING_CONFIGURED = True
+
+@lru_cache(maxsize=4)
+def _resolve_config(config_name, instance_path):
+    """Return the config class and its settings merged with instance/config.py, once per name."""
+    from .config import config
+    
+    config_class = config.get(config_name, config['default'])
+    settings = FlaskConfig(instance_path)
+    settings.from_object(config_class)
+    settings.from_pyfile('config.py', silent=True)
+    return config_class, MappingProxyType(dict(settings))
+
+def _is_flask_db_command():
+    """Check whether this process is running a `flask db ...` CLI command."""
+    argv0 = sys.argv[0] if sys.argv else ''
+    is_flask_cli = (
+        os.path.basename(argv0).startswith('flask')
+        or argv0.endswith(os.path.join('flask', '__main__.py'))
+    )
+    return is_flask_cli and 'db' in sys.argv[1:]
+
+@lru_cache(maxsize=8)
+def _ensure_dirs(*paths):
+    """Create the given directories, once per process for each distinct set of paths."""
+    for path in paths:
+        os.makedirs(path, exist_ok=True)
+
+@lru_cache(maxsize=1)
+def _load_blueprints():
+    """Import the route blueprints once; imported lazily to avoid circular imports."""
+    from .routes.api import api_bp
+    from .routes.frontend import frontend_bp
+    return api_bp, frontend_bp
+
+def _precompile_templates(app):
+    """Compile every template into the Jinja environment's cache."""
+    for template_name in app.jinja_env.list_templates():
+        try:
+            app.jinja_env.get_template(template_name)
+        except Exception as e:
+            app.logger.warning(f"Could not precompile template {template_name}: {e}")
+
+def _log_boot_phase(app, phase, boot_start):
+    """Log the time since create_app started after a boot phase, when PROFILE_BOOT is enabled."""
+    if app.config.get('PROFILE_BOOT'):
+        app.logger.info(f"Boot phase={phase} elapsed_ms={(time.perf_counter() - boot_start) * 1000:.2f}")
+
+def _is_memory_database(engine):
+    """Check whether the engine uses an in-memory SQLite database."""
+    # Every engine on an in-memory SQLite URL gets a fresh, empty database, so
+    # nothing learned about one of them applies to another with the same URL
+    return engine.url.database in (None, '', ':memory:')
+
+# Schema inspectors per database URL; reusing one keeps its reflection cache (info_cache)
+# warm across checks and across app instances created in the same process
+_INSPECTOR_CACHE = {}
+
+def _get_inspector(db):
+    """Return the schema inspector for the current database, creating it on first use."""
+    from sqlalchemy import inspect
+    
+    engine = db.engine
+    # Not cached for in-memory databases: the inspector would keep the first app's
+    # engine (and its pool) alive and be used to inspect every later app's database
+    if _is_memory_database(engine):
+        return inspect(engine)
+    if engine.url not in _INSPECTOR_CACHE:
+        _INSPECTOR_CACHE[engine.url] = inspect(engine)
+    return _INSPECTOR_CACHE[engine.url]
+
+# Database URLs whose schema has been checked by this process
+_SCHEMA_CHECKED = set()
+
+def _mark_schema_checked(db):
+    """Remember that the schema of the current database is up to date."""
+    # In-memory databases start empty, so those must be bootstrapped every time
+    if not _is_memory_database(db.engine):
+        _SCHEMA_CHECKED.add(db.engine.url)
+
+# Advisory lock key serialising the startup schema check across workers on PostgreSQL
+_SCHEMA_LOCK_KEY = 72810431
+
+def _column_exists(db, table_name, column_name):
+    """Check whether a column exists, using the cached inspector."""
+    inspector = _get_inspector(db)
+    if table_name not in inspector.get_table_names():
+        return False
+    return any(col['name'] == column_name for col in inspector.get_columns(table_name))
 
 def _ensure_database_schema(app, db):
     """Ensure database schema matches the models, fixing any missing columns."""
+    from .config import SCHEMA_COLUMN_FIXES
+    
+    # The columns only need to be added once; later app instances in this process skip the check
+    if db.engine.url in _SCHEMA_CHECKED:
+        return
+    
     try:
-        from sqlalchemy import text, inspect
-        
-        inspector = inspect(db.engine)
-        
-        # Check configuration table for missing trip_assign_count column
-        if 'configuration' in inspector.get_table_names():
-            existing_columns = [col['name'] for col in inspector.get_columns('configuration')]
-            
-            if 'trip_assign_count' not in existing_columns:
-                app.logger.info("Adding missing trip_assign_count column to configuration table...")
-                
-                try:
-                    add_column_sql = """
-                    ALTER TABLE configuration 
-                    ADD COLUMN trip_assign_count INTEGER DEFAULT 1 NOT NULL;
-                    """
-                    
-                    db.session.execute(text(add_column_sql))
-                    db.session.commit()
-                    
-                    app.logger.info("Successfully added trip_assign_count column during app startup.")
-                    
-                except Exception as col_error:
-                    app.logger.warning(f"Failed to add trip_assign_count column: {col_error}")
+        if db.engine.dialect.name == 'postgresql':
+            # PostgreSQL skips columns that already exist, so no existence check is needed
+            try:
+                # Only one worker runs the DDL; the others skip while it holds the lock
+                # (released automatically at commit/rollback)
+                lock_acquired = db.session.execute(
+                    text("SELECT pg_try_advisory_xact_lock(:key)"), {'key': _SCHEMA_LOCK_KEY}
+                ).scalar()
+                if not lock_acquired:
+                    app.logger.info("Schema check is running in another process, skipping.")
                     db.session.rollback()
-                    
-                    # Try alternative check
-                    try:
-                        check_sql = """
-                        SELECT column_name 
-                        FROM information_schema.columns 
-                        WHERE table_name = 'configuration' 
-                        AND column_name = 'trip_assign_count';
-                        """
-                        result = db.session.execute(text(check_sql)).fetchone()
-                        
-                        if not result:
-                            db.session.execute(text(add_column_sql))
-                            db.session.commit()
-                            app.logger.info("Successfully added column using alternative method.")
-                        else:
-                            app.logger.info("Column already exists (detected via information_schema).")
-                            
-                    except Exception as alt_error:
-                        app.logger.error(f"All attempts to add trip_assign_count column failed: {alt_error}")
-                        db.session.rollback()
-            else:
-                app.logger.info("trip_assign_count column already exists in configuration table.")
-        else:
-            app.logger.warning("Configuration table not found during schema check.")
-            
-        # Check scenario table for missing order_index column
-        if 'scenario' in inspector.get_table_names():
-            existing_columns = [col['name'] for col in inspector.get_columns('scenario')]
-            
-            if 'order_index' not in existing_columns:
-                app.logger.info("Adding missing order_index column to scenario table...")
+                    return
                 
-                try:
-                    add_column_sql = """
-                    ALTER TABLE scenario 
-                    ADD COLUMN order_index INTEGER DEFAULT 0 NOT NULL;
-                    """
-                    
-                    db.session.execute(text(add_column_sql))
-                    db.session.commit()
-                    
-                    app.logger.info("Successfully added order_index column during app startup.")
-                    
-                except Exception as col_error:
-                    app.logger.warning(f"Failed to add order_index column: {col_error}")
-                    db.session.rollback()
-                    
-                    # Try alternative check
-                    try:
-                        check_sql = """
-                        SELECT column_name 
-                        FROM information_schema.columns 
-                        WHERE table_name = 'scenario' 
-                        AND column_name = 'order_index';
-                        """
-                        result = db.session.execute(text(check_sql)).fetchone()
-                        
-                        if not result:
-                            db.session.execute(text(add_column_sql))
-                            db.session.commit()
-                            app.logger.info("Successfully added order_index column using alternative method.")
-                        else:
-                            app.logger.info("order_index column already exists (detected via information_schema).")
-                            
-                    except Exception as alt_error:
-                        app.logger.error(f"All attempts to add order_index column failed: {alt_error}")
-                        db.session.rollback()
-            else:
-                app.logger.info("order_index column already exists in scenario table.")
-        else:
-            app.logger.warning("Scenario table not found during schema check.")
+                for table_name, column_name, column_definition in SCHEMA_COLUMN_FIXES:
+                    db.session.execute(text(
+                        f"ALTER TABLE IF EXISTS {table_name} "
+                        f"ADD COLUMN IF NOT EXISTS {column_name} {column_definition};"
+                    ))
+                db.session.commit()
+                _mark_schema_checked(db)
+                app.logger.info("Schema columns ensured.")
+            except Exception as col_error:
+                app.logger.error(f"Failed to ensure schema columns: {col_error}")
+                db.session.rollback()
+            return
+        
+        # Other dialects (local SQLite) lack ADD COLUMN IF NOT EXISTS, so only the
+        # missing columns are collected and then added together in one transaction
+        ddl_statements = []
+        for table_name, column_name, column_definition in SCHEMA_COLUMN_FIXES:
+            if _column_exists(db, table_name, column_name):
+                app.logger.info(f"{column_name} column already exists in {table_name} table.")
+                continue
+            
+            app.logger.info(f"Adding missing {column_name} column to {table_name} table...")
+            ddl_statements.append(
+                f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_definition};"
+            )
+        
+        if ddl_statements:
+            try:
+                with db.engine.begin() as conn:
+                    for add_column_sql in ddl_statements:
+                        conn.execute(text(add_column_sql))
+                app.logger.info(f"Successfully added {len(ddl_statements)} column(s) during app startup.")
+            except Exception as col_error:
+                app.logger.error(f"Failed to add missing columns: {col_error}")
+                return
+            finally:
+                # The cached column lists no longer reflect the database
+                _get_inspector(db).clear_cache()
+        
+        _mark_schema_checked(db)
             
     except Exception as e:
         app.logger.error(f"Database schema check failed: {e}")
         import traceback
         app.logger.error(f"Traceback: {traceback.format_exc()}")
 
-def create_app(config_name=None):
-    """Creates and configures the Flask application."""
+# Alembic head revision per migrations directory, computed once per process
+_ALEMBIC_HEAD_CACHE = {}
+
+def _get_alembic_head(migrations_dir):
+    """Return the head revision of the migrations directory, or None if unavailable."""
+    if migrations_dir not in _ALEMBIC_HEAD_CACHE:
+        head = None
+        if os.path.isdir(migrations_dir):
+            try:
+                from alembic.config import Config as AlembicConfig
+                from alembic.script import ScriptDirectory
+                
+                alembic_cfg = AlembicConfig()
+                alembic_cfg.set_main_option('script_location', migrations_dir)
+                head = ScriptDirectory.from_config(alembic_cfg).get_current_head()
+            except Exception as e:
+                logging.getLogger(__name__).debug(f"Could not determine Alembic head: {e}")
+        _ALEMBIC_HEAD_CACHE[migrations_dir] = head
+    return _ALEMBIC_HEAD_CACHE[migrations_dir]
+
+def _schema_at_alembic_head(app, db):
+    """Check whether the database is already stamped at the current Alembic head."""
+    head = _get_alembic_head(os.path.join(app.config['BASE_DIR'], 'migrations'))
+    if head is None:
+        return False
+    
+    try:
+        current = db.session.execute(text("SELECT version_num FROM alembic_version LIMIT 1")).scalar()
+    except Exception:
+        # No alembic_version table yet
+        db.session.rollback()
+        return False
+    return current == head
+
+def bootstrap_schema(app):
+    """Create missing tables and add any missing columns for the app's database."""
+    from .extensions import db
+    
+    with app.app_context():
+        try:
+            # Tables and columns were already ensured for this database by this process
+            if db.engine.url in _SCHEMA_CHECKED:
+                app.logger.debug("Database schema already ensured in this process, skipping")
+                return
+            
+            # Create tables unless migrations have already brought the database to head
+            if _schema_at_alembic_head(app, db):
+                app.logger.info("Database is at the Alembic head revision, skipping create_all")
+            else:
+                db.create_all()
+                app.logger.info("Database tables ensured")
+            
+            # Check and fix missing columns
+            _ensure_database_schema(app, db)
+            
+        except Exception as e:
+            app.logger.error(f"Error ensuring database schema: {e}")
+            if app.config.get('TESTING'):
+                raise  # Re-raise in testing to fail fast
+
+def create_app(config_name=None, engine_options=None):
+    """Creates and configures the Flask application.
+    
+    engine_options, if given, are merged over the configured SQLALCHEMY_ENGINE_OPTIONS
+    so one-shot scripts (e.g. migrate.py) can use a different connection pool.
+    """
     app = Flask(
         __name__, 
         instance_relative_config=True, 
@@ -118,28 +272,41 @@ def create_app(config_name=None):
         static_folder='../static', 
         static_url_path='/static'
     )
+    boot_start = time.perf_counter()
+    # jsonify() and request.get_json() go through orjson
+    app.json = OrjsonProvider(app)
 
     # 1. Load Configuration
-    from .config import config
-    
     # Determine configuration to use
     if config_name is None:
         config_name = os.environ.get('FLASK_ENV', 'production')
     
-    config_class = config.get(config_name, config['default'])
-    app.config.from_object(config_class)
-    app.config.from_pyfile('config.py', silent=True)
-    
-    # Set the database URI using the classmethod
-    db_uri = config_class.get_database_uri()
-    if 'sslmode' in db_uri:
-        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-            'connect_args': {'sslmode': 'require'}
-        }
-        # Remove sslmode from the URI as it's now in connect_args
-        db_uri = db_uri.split('?')[0]
+    config_class, settings = _resolve_config(config_name, app.instance_path)
+    app.config.update(settings)
+    
+    # Set the database URI and driver options (resolved once per process by the config)
+    db_uri, connect_args = config_class.get_database_settings()
+    # Copy so per-app changes never leak into the config class attribute
+    engine_opts = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    if connect_args:
+        # Merge rather than replace, keeping the config's pool settings
+        engine_opts['connect_args'] = {**engine_opts.get('connect_args', {}), **connect_args}
+    if engine_options:
+        engine_opts.update(engine_options)
+        if engine_opts.get('poolclass') is NullPool:
+            # NullPool opens a connection per checkout and rejects the pool-only arguments
+            from .config import QUEUEPOOL_ONLY_KEYS
+            for key in QUEUEPOOL_ONLY_KEYS:
+                engine_opts.pop(key, None)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_opts
     app.config['SQLALCHEMY_DATABASE_URI'] = db_uri
     
+    # 2. Configure Logging (before anything touches app.logger, so Flask does not
+    # attach its own default handler and every message is emitted once)
+    _configure_logging(app)
+    app.logger.info("Flask App Initializing...")
+    _log_boot_phase(app, 'config', boot_start)
+    
     # Initialize configuration-specific settings
     if hasattr(config_class, 'init_app'):
         config_class.init_app(app)
@@ -148,64 +315,59 @@ def create_app(config_name=None):
     if 'BASE_DIR' not in app.config:
          app.config['BASE_DIR'] = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
-    # 2. Configure Logging
-    logging.basicConfig(
-        level=app.config.get('LOGGING_LEVEL', 'INFO'),
-        format=app.config.get('LOGGING_FORMAT', '%(asctime)s - %(levelname)s - %(message)s')
-    )
-    app.logger.info("Flask App Initializing...")
-
     # 3. Create Essential Directories (only for local storage)
     if not app.config.get('USE_CLOUDINARY'):
-        os.makedirs(os.path.join(app.config['BASE_DIR'], "instance"), exist_ok=True)
-        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-        os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
-        app.logger.info(f"Upload folder: {app.config['UPLOAD_FOLDER']}")
-        app.logger.info(f"Output folder: {app.config['OUTPUT_FOLDER']}")
+        _ensure_dirs(
+            os.path.join(app.config['BASE_DIR'], "instance"),
+            app.config['UPLOAD_FOLDER'],
+            app.config['OUTPUT_FOLDER']
+        )
+        if app.logger.isEnabledFor(logging.INFO):
+            app.logger.info(f"Upload folder: {app.config['UPLOAD_FOLDER']}")
+            app.logger.info(f"Output folder: {app.config['OUTPUT_FOLDER']}")
+        _log_boot_phase(app, 'directories', boot_start)
 
     # 4. Initialize Extensions
     from .extensions import db
     db.init_app(app)
     app.logger.info("Database Initialized.")
     
-    # Initialize Flask-Migrate
-    from flask_migrate import Migrate
-    migrate = Migrate(app, db)
-    app.logger.info("Flask-Migrate Initialized.")
+    # Initialize Flask-Migrate (Alembic is only needed where migrations are run)
+    if app.config.get('ENABLE_MIGRATIONS') or _is_flask_db_command():
+        from flask_migrate import Migrate
+        migrate = Migrate(app, db)
+        app.logger.info("Flask-Migrate Initialized.")
     
     # Import models so SQLAlchemy knows about them
     from . import models
+    _log_boot_phase(app, 'extensions', boot_start)
     
-    # Ensure database schema is up to date
-    with app.app_context():
-        try:
-            # Always create tables first (safe operation)
-            db.create_all()
-            app.logger.info("Database tables ensured")
-            
-            # Check and fix missing columns
-            _ensure_database_schema(app, db)
-            
-        except Exception as e:
-            app.logger.error(f"Error ensuring database schema: {e}")
-            if app.config.get('TESTING'):
-                raise  # Re-raise in testing to fail fast
+    # Ensure database schema is up to date. Deploys run migrate.py before any
+    # worker starts, so workers skip this unless it is explicitly requested or
+    # there is no separate migration step (development/testing).
+    if os.environ.get('TRAFFICAPP_BOOTSTRAP_SCHEMA') or app.debug or app.testing:
+        bootstrap_schema(app)
+        _log_boot_phase(app, 'schema', boot_start)
     
-    # 5. Initialize Cloudinary
-    with app.app_context():
-        from .storage import init_cloudinary
-        init_cloudinary()
+    # 5. Cloudinary is configured lazily by the storage module on first upload/delete,
+    # so processes that never touch media (migrate.py, most workers) skip the SDK entirely
 
     # 6. Import and Register Blueprints
-    from .routes.api import api_bp
-    from .routes.frontend import frontend_bp
+    api_bp, frontend_bp = _load_blueprints()
     
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(frontend_bp)
+    _log_boot_phase(app, 'blueprints', boot_start)
     
     # 7. Register Error Handlers
     from .error_handlers import register_error_handlers
     register_error_handlers(app)
     
+    # 8. Compile templates up front in production so the first requests don't pay for it
+    # (development keeps lazy compilation and auto-reload)
+    if not app.debug and not app.testing:
+        _precompile_templates(app)
+        _log_boot_phase(app, 'templates', boot_start)
+    
     app.logger.info("Flask App Initialization Complete.")
     return app
\ No newline at end of file
@@ -1,23 +1,95 @@
 import logging
 import os
+import re
+import orjson
 import requests
 from datetime import datetime
 from flask import url_for, current_app
+from werkzeug.utils import secure_filename
+from sqlalchemy import delete, exists, insert, select
+from sqlalchemy.orm import selectinload
+from urllib3.util import Retry
+from .cache import cached_read, invalidates_read_cache
+from .utils import (
+    build_scenario_names, parse_configuration_request, validate_file_extension, save_uploaded_file,
+    get_absolute_path, get_relative_path, get_scenario_folder_path, find_missing_files, delete_replaced_file_later,
+    fail_stale_processing, get_reported_status, claim_scenario_for_processing,
+    start_background_processing, delete_scenario_files, delete_scenario_folders,
+    delete_configuration_folders, delete_study_folders, schedule_empty_folder_cleanup
+)
 from typing import Dict, List, Any, Tuple, Optional, Union
 
 try:
-    from .models import Study, Configuration, Scenario, ProcessingStatus
+    from .models import (
+        Study, Configuration, Scenario, ProcessingStatus,
+        READY_AFTER_UPLOAD_STATUSES, STATUS_NAMES, STATUS_VALUES
+    )
     from .extensions import db
+    _MODELS_AVAILABLE = True
 except ImportError:
     # Fallback for cases where models aren't available
     Study = Configuration = Scenario = ProcessingStatus = db = None
+    READY_AFTER_UPLOAD_STATUSES = STATUS_NAMES = STATUS_VALUES = None
+    _MODELS_AVAILABLE = False
+
+# One session per process so HTTP calls reuse pooled keep-alive connections
+# instead of opening a new TCP (and TLS) connection per request. Failed
+# connects are retried briefly; urllib3's Retry leaves non-idempotent methods
+# (POST) alone on read errors, so a write is never sent twice
+_http = requests.Session()
+_http_adapter = requests.adapters.HTTPAdapter(
+    pool_connections=16, pool_maxsize=20,
+    max_retries=Retry(total=2, backoff_factor=0.1)
+)
+_http.mount('http://', _http_adapter)
+_http.mount('https://', _http_adapter)
+
+# Request bodies are pre-encoded with orjson rather than passed as json= (stdlib json)
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# Path templates of API endpoints (e.g. '/api/studies/{study_id}'), built from the URL map once per endpoint
+_API_PATH_TEMPLATES: Dict[str, str] = {}
+_RULE_ARGUMENT = re.compile(r'<(?:[^<>:]+:)?([^<>]+)>')
+
+def _use_internal_api() -> bool:
+    """Whether to query the database directly (USE_INTERNAL_API) instead of calling the HTTP API."""
+    # Model availability is fixed at import time, so only the config is looked up per call
+    return _MODELS_AVAILABLE and current_app.config.get('USE_INTERNAL_API', False)
+
+def _api_url(endpoint: str, **values: Any) -> str:
+    """Absolute URL of an API endpoint for the HTTP-based calls.
+
+    With API_BASE_URL configured, the URL is formatted from a cached path
+    template, skipping url_for's URL building on every call. Without it,
+    url_for is used as before.
+    """
+    base_url = current_app.config.get('API_BASE_URL')
+    if not base_url:
+        return url_for(endpoint, _external=True, **values)
+    template = _API_PATH_TEMPLATES.get(endpoint)
+    if template is None:
+        rule = next(current_app.url_map.iter_rules(endpoint))
+        template = _API_PATH_TEMPLATES[endpoint] = _RULE_ARGUMENT.sub(r'{\1}', rule.rule)
+    return base_url.rstrip('/') + template.format(**values)
+
+def _json(response: requests.Response) -> Any:
+    """Decode a JSON response body with orjson instead of the stdlib-based response.json()."""
+    try:
+        return orjson.loads(response.content)
+    except orjson.JSONDecodeError as e:
+        # Keep raising what response.json() raises, so existing RequestException handlers still apply
+        raise requests.exceptions.JSONDecodeError(e.msg, e.doc, e.pos, response=response)
 
 def _parse_date(date_str: Optional[str]) -> Optional[datetime]:
     """Parse ISO format date string to datetime object."""
     if not date_str:
         return None
     try:
-        return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+        # fromisoformat only understands a trailing 'Z' from Python 3.11 on;
+        # rewrite just that suffix rather than scanning the whole string
+        if date_str.endswith('Z'):
+            return datetime.fromisoformat(date_str[:-1] + '+00:00')
+        return datetime.fromisoformat(date_str)
     except Exception as e:
         logging.error(f"Error parsing date {date_str}: {e}")
         return None
@@ -34,6 +106,7 @@ def _process_dates_in_list(data_list: List[Dict[str, Any]]) -> List[Dict[str, An
         _process_dates_in_dict(item)
     return data_list
 
+@cached_read
 def get_studies() -> Tuple[List[Dict[str, Any]], Optional[str]]:
     """Get all studies from the API or database directly.
     
@@ -44,47 +117,65 @@ def get_studies() -> Tuple[List[Dict[str, Any]], Optional[str]]:
     error = None
     
     # Check if we should use internal database calls (for production)
-    if current_app.config.get('USE_INTERNAL_API', False) and Study is not None:
+    if _use_internal_api():
         try:
             # Direct database query instead of HTTP request
-            study_objects = Study.query.order_by(Study.created_at.desc()).all()
+            # Plain column selects come back as Row tuples, so no ORM instances,
+            # identity-map bookkeeping or attribute descriptors are paid per field
+            study_rows = db.session.execute(
+                select(Study.id, Study.name, Study.analyst_name, Study.created_at)
+                .order_by(Study.created_at.desc())
+            ).all()
+            config_rows = db.session.execute(
+                select(Configuration.id, Configuration.study_id, Configuration.name)
+                .order_by(Configuration.id)
+            ).all()
+            scenario_rows = db.session.execute(
+                select(Scenario.id, Scenario.configuration_id, Scenario.name, Scenario.status)
+                .order_by(Scenario.id)
+            ).all()
+            
+            # Group scenarios under their configuration and configurations under their study
+            scenarios_by_config = {}
+            for row in scenario_rows:
+                scenarios_by_config.setdefault(row.configuration_id, []).append({
+                    "id": row.id,
+                    "name": row.name,
+                    "status": {"value": STATUS_VALUES[row.status]}
+                })
+            configs_by_study = {}
+            for row in config_rows:
+                configs_by_study.setdefault(row.study_id, []).append({
+                    "id": row.id,
+                    "name": row.name,
+                    "scenarios": scenarios_by_config.get(row.id, [])
+                })
+            
             studies = []
-            for s in study_objects:
-                study_dict = {
-                    "id": s.id,
-                    "name": s.name,
-                    "analyst_name": s.analyst_name,
-                    "created_at": s.created_at.isoformat() if s.created_at else None,
-                    "configurations_count": len(s.configurations),
-                    "scenarios_count": len(s.scenarios),
-                    "configurations": []
-                }
-                # Add full configuration and scenario data for status calculation
-                for config in s.configurations:
-                    config_dict = {
-                        "id": config.id,
-                        "name": config.name,
-                        "scenarios": []
-                    }
-                    for scenario in config.scenarios:
-                        scenario_dict = {
-                            "id": scenario.id,
-                            "name": scenario.name,
-                            "status": {"value": scenario.status.value}
-                        }
-                        config_dict["scenarios"].append(scenario_dict)
-                    study_dict["configurations"].append(config_dict)
-                studies.append(study_dict)
+            for row in study_rows:
+                configurations = configs_by_study.get(row.id, [])
+                studies.append({
+                    "id": row.id,
+                    "name": row.name,
+                    "analyst_name": row.analyst_name,
+                    # Same datetime the HTTP path yields after parsing, without the string round-trip
+                    "created_at": row.created_at,
+                    "configurations_count": len(configurations),
+                    # Every scenario belongs to one of the study's configurations
+                    "scenarios_count": sum(len(config["scenarios"]) for config in configurations),
+                    # Full configuration and scenario data for status calculation
+                    "configurations": configurations
+                })
         except Exception as e:
             error = f'Database error fetching studies: {e}'
             logging.error(f"API Client: Database error fetching studies: {e}")
     else:
         # Original HTTP-based approach for development
-        api_url = url_for('api.studies', _external=True)
+        api_url = _api_url('api.studies')
         try:
-            response = requests.get(api_url)
+            response = _http.get(api_url)
             response.raise_for_status()
-            studies = response.json()
+            studies = _json(response)
             studies = _process_dates_in_list(studies)
         except requests.exceptions.RequestException as e:
             error = f'Error fetching studies from API: {e}'
@@ -95,6 +186,7 @@ def get_studies() -> Tuple[List[Dict[str, Any]], Optional[str]]:
     
     return studies, error
 
+@invalidates_read_cache
 def create_study(name: str, analyst_name: str) -> Tuple[Dict[str, Any], Optional[str], int]:
     """Create a new study via the API or database directly.
     
@@ -110,7 +202,7 @@ def create_study(name: str, analyst_name: str) -> Tuple[Dict[str, Any], Optional
     status_code = 0
     
     # Check if we should use internal database calls (for production)
-    if current_app.config.get('USE_INTERNAL_API', False) and Study is not None:
+    if _use_internal_api():
         try:
             # Direct database operation instead of HTTP request
             new_study = Study(name=name.strip(), analyst_name=analyst_name.strip())
@@ -121,7 +213,7 @@ def create_study(name: str, analyst_name: str) -> Tuple[Dict[str, Any], Optional
                 "id": new_study.id,
                 "name": new_study.name,
                 "analyst_name": new_study.analyst_name,
-                "created_at": new_study.created_at.isoformat() if new_study.created_at else None
+                "created_at": new_study.created_at
             }
             status_code = 201
         except Exception as e:
@@ -131,14 +223,14 @@ def create_study(name: str, analyst_name: str) -> Tuple[Dict[str, Any], Optional
             logging.error(f"API Client: Database error creating study: {e}")
     else:
         # Original HTTP-based approach for development
-        api_url = url_for('api.studies', _external=True)
+        api_url = _api_url('api.studies')
         try:
-            response = requests.post(api_url, json={
+            response = _http.post(api_url, data=orjson.dumps({
                 'name': name.strip(),
                 'analyst_name': analyst_name.strip()
-            })
+            }), headers=_JSON_HEADERS)
             status_code = response.status_code
-            data = response.json()
+            data = _json(response)
             
             if 'created_at' in data:
                 data['created_at'] = _parse_date(data['created_at'])
@@ -151,6 +243,7 @@ def create_study(name: str, analyst_name: str) -> Tuple[Dict[str, Any], Optional
     
     return data, error, status_code
 
+@cached_read
 def get_configurations(study_id: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     """Get configurations for a study from the API or database directly.
     
@@ -164,7 +257,7 @@ def get_configurations(study_id: int) -> Tuple[List[Dict[str, Any]], Optional[st
     error = None
     
     # Check if we should use internal database calls (for production)
-    if current_app.config.get('USE_INTERNAL_API', False) and Configuration is not None:
+    if _use_internal_api():
         try:
             # Direct database operation instead of HTTP request
             study = db.session.get(Study, study_id)
@@ -172,39 +265,30 @@ def get_configurations(study_id: int) -> Tuple[List[Dict[str, Any]], Optional[st
                 error = f"Study {study_id} not found."
                 return configurations, error
             
-            # Get configurations for this study
-            config_objects = db.session.query(Configuration).filter_by(study_id=study_id).all()
+            # Get configurations for this study as plain rows (no ORM instances)
+            config_rows = db.session.execute(
+                select(
+                    Configuration.id, Configuration.study_id, Configuration.name, Configuration.phases_n,
+                    Configuration.include_bg_dist, Configuration.include_bg_assign,
+                    Configuration.include_trip_dist, Configuration.trip_dist_count,
+                    Configuration.include_trip_assign, Configuration.created_at
+                ).where(Configuration.study_id == study_id)
+            ).all()
             
-            # Convert to dictionaries
-            configurations = []
-            for config in config_objects:
-                config_dict = {
-                    'id': config.id,
-                    'study_id': config.study_id,
-                    'name': config.name,
-                    'phases_n': config.phases_n,
-                    'include_bg_dist': config.include_bg_dist,
-                    'include_bg_assign': config.include_bg_assign,
-                    'include_trip_dist': config.include_trip_dist,
-                    'trip_dist_count': config.trip_dist_count,
-                    'include_trip_assign': config.include_trip_assign,
-                    'created_at': config.created_at.isoformat() if config.created_at else None
-                }
-                configurations.append(config_dict)
-            
-            # Process dates in the list
-            configurations = _process_dates_in_list(configurations)
+            # Convert to dictionaries; created_at stays a datetime, so there is
+            # no isoformat()/fromisoformat() round-trip as on the HTTP path
+            configurations = [row._asdict() for row in config_rows]
             
         except Exception as e:
             error = f'Database error fetching configurations: {e}'
             logging.error(f"API Client: Database error fetching configurations for study {study_id}: {e}")
     else:
         # Original HTTP-based approach for development
-        api_url = url_for('api.get_configurations', study_id=study_id, _external=True)
+        api_url = _api_url('api.get_configurations', study_id=study_id)
         try:
-            response = requests.get(api_url)
+            response = _http.get(api_url)
             response.raise_for_status()
-            configurations = response.json()
+            configurations = _json(response)
             configurations = _process_dates_in_list(configurations)
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 404:
@@ -221,6 +305,7 @@ def get_configurations(study_id: int) -> Tuple[List[Dict[str, Any]], Optional[st
     
     return configurations, error
 
+@invalidates_read_cache
 def configure_study(study_id: int, config_data: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str], int]:
     """Configure a study via the API or database directly.
     
@@ -236,7 +321,7 @@ def configure_study(study_id: int, config_data: Dict[str, Any]) -> Tuple[Dict[st
     status_code = 200
     
     # Check if we should use internal database calls (for production)
-    if current_app.config.get('USE_INTERNAL_API', False) and Configuration is not None:
+    if _use_internal_api():
         try:
             # Direct database operation instead of HTTP request
             study = db.session.get(Study, study_id)
@@ -245,103 +330,45 @@ def configure_study(study_id: int, config_data: Dict[str, Any]) -> Tuple[Dict[st
                 status_code = 404
                 return data, error, status_code
             
-            # Validate required fields
-            if not config_data or 'phases_n' not in config_data or 'config_name' not in config_data:
-                error = "'phases_n' and 'config_name' required"
-                status_code = 400
-                return data, error, status_code
-            
-            try:
-                n = int(config_data['phases_n'])
-                assert n >= 0
-            except (ValueError, AssertionError):
-                error = "Invalid 'phases_n', must be a non-negative integer."
-                status_code = 400
-                return data, error, status_code
-            
-            config_name = config_data['config_name'].strip()
-            if not config_name:
-                error = "'config_name' cannot be empty"
+            # Validate the request body
+            fields, error = parse_configuration_request(config_data)
+            if error:
                 status_code = 400
                 return data, error, status_code
+            config_name = fields['name']
             
             # Check if configuration name already exists for this study
-            existing_config = Configuration.query.filter_by(study_id=study_id, name=config_name).first()
-            if existing_config:
+            # EXISTS returns a single boolean instead of loading a full Configuration row
+            name_taken = db.session.execute(
+                select(exists().where(Configuration.study_id == study_id, Configuration.name == config_name))
+            ).scalar()
+            if name_taken:
                 error = f"Configuration name '{config_name}' already exists for this study"
                 status_code = 400
                 return data, error, status_code
             
-            def get_b(p): return config_data.get(p, False) is True
-            incl = {k: get_b(k) for k in ['include_bg_dist', 'include_bg_assign', 'include_trip_dist', 'include_trip_assign']}
-            
-            # Get trip distribution count if trip distribution is included
-            trip_dist_count = 1
-            if incl['include_trip_dist'] and 'trip_dist_count' in config_data:
-                try:
-                    trip_dist_count = int(config_data['trip_dist_count'])
-                    if trip_dist_count < 1:
-                        trip_dist_count = 1
-                except (ValueError, TypeError):
-                    trip_dist_count = 1
-            
-            # Get trip assignment count if trip assignment is included
-            trip_assign_count = 1
-            if incl['include_trip_assign'] and 'trip_assign_count' in config_data:
-                try:
-                    trip_assign_count = int(config_data['trip_assign_count'])
-                    if trip_assign_count < 1:
-                        trip_assign_count = 1
-                except (ValueError, TypeError):
-                    trip_assign_count = 1
-            
             # Create a new configuration
-            new_config = Configuration(
-                study_id=study_id,
-                name=config_name,
-                phases_n=n,
-                include_bg_dist=incl['include_bg_dist'],
-                include_bg_assign=incl['include_bg_assign'],
-                include_trip_dist=incl['include_trip_dist'],
-                trip_dist_count=trip_dist_count,
-                include_trip_assign=incl['include_trip_assign'],
-                trip_assign_count=trip_assign_count
-            )
+            new_config = Configuration(study_id=study_id, **fields)
             
             db.session.add(new_config)
             db.session.flush()  # Get the new configuration ID
             
             # Create scenarios for this configuration
-            scenarios_to_add = [Scenario(study_id=study.id, configuration_id=new_config.id, name='Existing', status=ProcessingStatus.PENDING_FILES)]
-            for i in range(1, n + 1):
-                scenarios_to_add.append(Scenario(study_id=study.id, configuration_id=new_config.id, name=f'No_Build_Phase_{i}', status=ProcessingStatus.PENDING_FILES))
-                scenarios_to_add.append(Scenario(study_id=study.id, configuration_id=new_config.id, name=f'Build_Phase_{i}', status=ProcessingStatus.PENDING_FILES))
-                if incl['include_bg_dist']: scenarios_to_add.append(Scenario(study_id=study.id, configuration_id=new_config.id, name=f'BG_Dev_Distribution_Phase_{i}', status=ProcessingStatus.PENDING_FILES))
-                if incl['include_bg_assign']: scenarios_to_add.append(Scenario(study_id=study.id, configuration_id=new_config.id, name=f'BG_Dev_Assignment_Phase_{i}', status=ProcessingStatus.PENDING_FILES))
-                
-                # Create multiple trip distribution scenarios if needed
-                if incl['include_trip_dist']:
-                    for j in range(1, trip_dist_count + 1):
-                        # If there's only one trip distribution, don't add a number suffix
-                        if trip_dist_count == 1:
-                            scenarios_to_add.append(Scenario(study_id=study.id, configuration_id=new_config.id, name=f'Trip_Distribution_Phase_{i}', status=ProcessingStatus.PENDING_FILES))
-                        else:
-                            scenarios_to_add.append(Scenario(study_id=study.id, configuration_id=new_config.id, name=f'Trip_Distribution_{j}_Phase_{i}', status=ProcessingStatus.PENDING_FILES))
-                
-                # Create multiple trip assignment scenarios if needed
-                if incl['include_trip_assign']:
-                    for j in range(1, trip_assign_count + 1):
-                        # If there's only one trip assignment, don't add a number suffix
-                        if trip_assign_count == 1:
-                            scenarios_to_add.append(Scenario(study_id=study.id, configuration_id=new_config.id, name=f'Trip_Assignment_Phase_{i}', status=ProcessingStatus.PENDING_FILES))
-                        else:
-                            scenarios_to_add.append(Scenario(study_id=study.id, configuration_id=new_config.id, name=f'Trip_Assignment_{j}_Phase_{i}', status=ProcessingStatus.PENDING_FILES))
-            
-            db.session.add_all(scenarios_to_add)
+            scenario_names = build_scenario_names(fields['phases_n'], fields, fields['trip_dist_count'], fields['trip_assign_count'])
+            
+            # Insert all scenarios with one batched INSERT; RETURNING hands back the new ids
+            # without per-object flushes or post-commit refreshes
+            scenario_rows = db.session.execute(
+                insert(Scenario).returning(Scenario.id, Scenario.name, Scenario.status),
+                [
+                    {'study_id': study.id, 'configuration_id': new_config.id, 'name': name, 'status': ProcessingStatus.PENDING_FILES}
+                    for name in scenario_names
+                ]
+            ).all()
             db.session.commit()
             
-            logging.info(f"API Client: Created configuration '{config_name}' for study {study_id} with {len(scenarios_to_add)} scenarios.")
-            s_list = [{"id": s.id, "name": s.name, "status": s.status.name} for s in scenarios_to_add]
+            logging.info(f"API Client: Created configuration '{config_name}' for study {study_id} with {len(scenario_rows)} scenarios.")
+            s_list = [{"id": row.id, "name": row.name, "status": STATUS_NAMES[row.status]} for row in sorted(scenario_rows, key=lambda row: row.id)]
             data = {
                 "message": "Configuration created",
                 "configuration": {
@@ -366,11 +393,11 @@ def configure_study(study_id: int, config_data: Dict[str, Any]) -> Tuple[Dict[st
             logging.error(f"API Client: Database error creating configuration for study {study_id}: {e}")
     else:
         # Original HTTP-based approach for development
-        api_url = url_for('api.configure_study', study_id=study_id, _external=True)
+        api_url = _api_url('api.configure_study', study_id=study_id)
         try:
-            response = requests.post(api_url, json=config_data)
+            response = _http.post(api_url, data=orjson.dumps(config_data), headers=_JSON_HEADERS)
             status_code = response.status_code
-            data = response.json()
+            data = _json(response)
             
             if status_code != 200:
                 error = data.get('error', f'Error creating configuration (API Status: {status_code}).')
@@ -381,6 +408,7 @@ def configure_study(study_id: int, config_data: Dict[str, Any]) -> Tuple[Dict[st
     
     return data, error, status_code
 
+@cached_read
 def get_scenarios(study_id: int, configuration_id: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     """Get scenarios for a study from the API or database directly.
     
@@ -395,7 +423,7 @@ def get_scenarios(study_id: int, configuration_id: Optional[int] = None) -> Tupl
     error = None
     
     # Check if we should use internal database calls (for production)
-    if current_app.config.get('USE_INTERNAL_API', False) and Scenario is not None:
+    if _use_internal_api():
         try:
             # Direct database operation instead of HTTP request
             study = db.session.get(Study, study_id)
@@ -403,27 +431,37 @@ def get_scenarios(study_id: int, configuration_id: Optional[int] = None) -> Tupl
                 error = f"Study {study_id} not found."
                 return scenarios, error
             
-            # Build query for scenarios
-            query = db.session.query(Scenario).join(Configuration).filter(Configuration.study_id == study_id)
+            # Build query for scenarios, selecting only the columns we return
+            query = (
+                select(
+                    Scenario.id, Scenario.configuration_id, Scenario.name, Scenario.created_at,
+                    Scenario.updated_at, Scenario.status, Scenario.status_message
+                )
+                .join(Configuration)
+                .where(Configuration.study_id == study_id)
+            )
             
             # Filter by configuration_id if provided
             if configuration_id:
-                query = query.filter(Scenario.configuration_id == configuration_id)
+                query = query.where(Scenario.configuration_id == configuration_id)
             
-            # Order by order_index first, then by creation time as fallback
-            scenario_objects = query.order_by(Scenario.order_index.asc(), Scenario.created_at.asc()).all()
+            # Order by order_index first, then by creation time as fallback; rows are
+            # fetched in batches while the dicts are built instead of all at once
+            scenario_rows = db.session.execute(
+                query.order_by(Scenario.order_index.asc(), Scenario.created_at.asc()).execution_options(yield_per=200)
+            )
             
             # Convert to dictionaries
             scenarios = []
-            for scenario in scenario_objects:
+            for row in scenario_rows:
                 scenario_dict = {
-                    'id': scenario.id,
-                    'configuration_id': scenario.configuration_id,
-                    'name': scenario.name,
-                    'created_at': scenario.created_at.isoformat() if scenario.created_at else None,
-                    'updated_at': scenario.updated_at.isoformat() if scenario.updated_at else None,
-                    'status': scenario.status.name if scenario.status else None,
-                    'status_message': scenario.status_message
+                    'id': row.id,
+                    'configuration_id': row.configuration_id,
+                    'name': row.name,
+                    'created_at': row.created_at.isoformat() if row.created_at else None,
+                    'updated_at': row.updated_at.isoformat() if row.updated_at else None,
+                    'status': STATUS_NAMES.get(row.status),
+                    'status_message': row.status_message
                 }
                 scenarios.append(scenario_dict)
             
@@ -432,14 +470,14 @@ def get_scenarios(study_id: int, configuration_id: Optional[int] = None) -> Tupl
             logging.error(f"API Client: Database error fetching scenarios for study {study_id}: {e}")
     else:
         # Original HTTP-based approach for development
-        api_url = url_for('api.get_scenarios', study_id=study_id, _external=True)
+        api_url = _api_url('api.get_scenarios', study_id=study_id)
         if configuration_id:
             api_url += f"?configuration_id={configuration_id}"
         
         try:
-            response = requests.get(api_url)
+            response = _http.get(api_url)
             response.raise_for_status()
-            scenarios = response.json()
+            scenarios = _json(response)
         except Exception as e:
             error = f'Error fetching scenarios: {e}'
             logging.error(f"API Client: Error fetching scenarios for study {study_id}: {e}")
@@ -460,21 +498,23 @@ def get_scenario_status(study_id: int, scenario_id: int) -> Tuple[Dict[str, Any]
     error = None
     
     # Check if we should use internal database calls (for production)
-    if current_app.config.get('USE_INTERNAL_API', False) and Scenario is not None:
+    if _use_internal_api():
         try:
             # Direct database operation instead of HTTP request
-            # Refresh the session to ensure we get the latest data
-            db.session.expire_all()
-            scenario = db.session.get(Scenario, scenario_id)
-            if not scenario:
-                error = 'Scenario not found.'
-                return scenario_data, error
-            
-            # Verify the scenario belongs to the correct study
-            config = db.session.get(Configuration, scenario.configuration_id)
-            if not config or config.study_id != study_id:
+            # Fetch the scenario and its configuration name in one query; the join also
+            # checks that the scenario belongs to this study. populate_existing reloads
+            # just this row so the status is current, rather than expiring the whole session
+            row = db.session.execute(
+                select(Scenario, Configuration.name)
+                .join(Configuration, Scenario.configuration_id == Configuration.id)
+                .where(Scenario.id == scenario_id, Configuration.study_id == study_id)
+                .execution_options(populate_existing=True)
+            ).first()
+            if row is None:
                 error = 'Scenario not found.'
                 return scenario_data, error
+            scenario, config_name = row
+            status, status_message = get_reported_status(scenario)
             
             # Build uploaded files info
             uploaded_files_info = [
@@ -503,12 +543,12 @@ def get_scenario_status(study_id: int, scenario_id: int) -> Tuple[Dict[str, Any]
                 'scenario_id': scenario.id,
                 'id': scenario.id,
                 'configuration_id': scenario.configuration_id,
-                'configuration_name': config.name,
+                'configuration_name': config_name,
                 'name': scenario.name,
                 'created_at': scenario.created_at.isoformat() if scenario.created_at else None,
                 'updated_at': scenario.updated_at.isoformat() if scenario.updated_at else None,
-                'status': scenario.status.name if scenario.status else None,
-                'status_message': scenario.status_message,
+                'status': status.name if status else None,
+                'status_message': status_message,
                 'uploaded_files': uploaded_files_info,
                 # Keep these for any part of the frontend still using them directly
                 'has_am_csv': bool(scenario.am_csv_path),
@@ -523,11 +563,11 @@ def get_scenario_status(study_id: int, scenario_id: int) -> Tuple[Dict[str, Any]
             logging.error(f"API Client: Database error fetching scenario {scenario_id} status: {e}")
     else:
         # Original HTTP-based approach for development
-        api_url = url_for('api.get_scenario_status', study_id=study_id, scenario_id=scenario_id, _external=True)
+        api_url = _api_url('api.get_scenario_status', study_id=study_id, scenario_id=scenario_id)
         try:
-            response = requests.get(api_url)
+            response = _http.get(api_url)
             response.raise_for_status()
-            scenario_data = response.json()
+            scenario_data = _json(response)
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 404:
                 error = 'Scenario not found.'
@@ -543,6 +583,7 @@ def get_scenario_status(study_id: int, scenario_id: int) -> Tuple[Dict[str, Any]
     
     return scenario_data, error
 
+@invalidates_read_cache
 def upload_file(study_id: int, scenario_id: int, file_type: str, file) -> Tuple[Dict[str, Any], Optional[str]]:
     """Upload a file for a scenario via the API or database directly.
     
@@ -559,12 +600,8 @@ def upload_file(study_id: int, scenario_id: int, file_type: str, file) -> Tuple[
     error = None
     
     # Check if we should use internal database calls (for production)
-    if current_app.config.get('USE_INTERNAL_API', False) and Scenario is not None:
+    if _use_internal_api():
         try:
-            from werkzeug.utils import secure_filename
-            from traffic_app.utils import validate_file_extension, save_uploaded_file, get_absolute_path
-            import os
-            
             # Verify scenario exists and belongs to study
             scenario = db.session.get(Scenario, scenario_id)
             if not scenario:
@@ -598,7 +635,7 @@ def upload_file(study_id: int, scenario_id: int, file_type: str, file) -> Tuple[
                 error = error_message
                 return data, error
             
-            # Delete existing file if it exists
+            # Detach the existing file; it is deleted once the new one is committed
             existing_file_path_relative = None
             if file_type == 'am_csv' and scenario.am_csv_path:
                 existing_file_path_relative = scenario.am_csv_path
@@ -610,14 +647,7 @@ def upload_file(study_id: int, scenario_id: int, file_type: str, file) -> Tuple[
                 existing_file_path_relative = scenario.attout_txt_path
                 scenario.attout_txt_path = None
             
-            if existing_file_path_relative:
-                try:
-                    existing_file_path_absolute = get_absolute_path(existing_file_path_relative)
-                    if os.path.exists(existing_file_path_absolute):
-                        os.remove(existing_file_path_absolute)
-                        logging.info(f"API Client: Deleted existing file '{existing_file_path_absolute}' for scenario {scenario_id}, type {file_type}.")
-                except Exception as e:
-                    logging.error(f"API Client: Error deleting existing file '{existing_file_path_relative}' for scenario {scenario_id}: {e}")
+            existing_file_path_absolute = get_absolute_path(existing_file_path_relative)
             
             # Save the file
             original_filename = secure_filename(file.filename)
@@ -636,11 +666,10 @@ def upload_file(study_id: int, scenario_id: int, file_type: str, file) -> Tuple[
                 scenario.attout_txt_original_name = original_filename
             
             # Update status based on whether all required files are now present
-            all_files_present = all([scenario.am_csv_path, scenario.pm_csv_path, scenario.attout_txt_path])
+            all_files_present = scenario.has_all_input_files
             
             if all_files_present:
-                if scenario.status in [ProcessingStatus.PENDING_CONFIG, ProcessingStatus.PENDING_FILES,
-                                       ProcessingStatus.COMPLETE, ProcessingStatus.ERROR]:
+                if scenario.status in READY_AFTER_UPLOAD_STATUSES:
                     scenario.status = ProcessingStatus.READY_TO_PROCESS
                     scenario.status_message = "All input files uploaded. Ready to process."
             else:
@@ -648,14 +677,18 @@ def upload_file(study_id: int, scenario_id: int, file_type: str, file) -> Tuple[
                     scenario.status = ProcessingStatus.PENDING_FILES
                     scenario.status_message = "Waiting for other input file(s)."
             
+            # commit() flushes itself, so no separate flush is needed
             db.session.commit()
-            db.session.flush()  # Ensure changes are immediately visible
+            saved_file_path_absolute = get_absolute_path(relative_save_path)
+            delete_replaced_file_later(existing_file_path_absolute, saved_file_path_absolute)
             
-            # Log the file path for debugging
-            logging.info(f"File saved to: {relative_save_path}, checking if exists: {os.path.exists(get_absolute_path(relative_save_path)) if get_absolute_path(relative_save_path) else 'Path resolution failed'}")
+            # Log the file path for debugging; the exists() check costs a stat per upload,
+            # so skip it entirely when INFO is not being logged
+            if logging.getLogger().isEnabledFor(logging.INFO):
+                logging.info(f"File saved to: {relative_save_path}, checking if exists: {os.path.exists(saved_file_path_absolute) if saved_file_path_absolute else 'Path resolution failed'}")
             
             data = {
-                "message": f"File '{secure_filename(file.filename)}' uploaded successfully for type '{file_type}'.",
+                "message": f"File '{original_filename}' uploaded successfully for type '{file_type}'.",
                 "saved_filename": filename,
                 "scenario_status": scenario.status.name
             }
@@ -666,13 +699,13 @@ def upload_file(study_id: int, scenario_id: int, file_type: str, file) -> Tuple[
             logging.error(f"API Client: Database error uploading file: {e}")
     else:
         # Original HTTP-based approach for development
-        api_url = url_for('api.upload_scenario_file', study_id=study_id, scenario_id=scenario_id, _external=True)
+        api_url = _api_url('api.upload_scenario_file', study_id=study_id, scenario_id=scenario_id)
         
         try:
             files = {'file': (file.filename, file.stream, file.content_type)}
             form_data = {'file_type': file_type}
-            response = requests.post(api_url, files=files, data=form_data)
-            data = response.json()
+            response = _http.post(api_url, files=files, data=form_data)
+            data = _json(response)
             
             if response.status_code != 200:
                 error = data.get('error', f'Error uploading file (API Status: {response.status_code}).')
@@ -682,6 +715,33 @@ def upload_file(study_id: int, scenario_id: int, file_type: str, file) -> Tuple[
     
     return data, error
 
+def _set_scenario_error(scenario_id: int, msg: str, clear_outputs: bool = False) -> None:
+    """Mark a scenario as ERROR with msg and commit; used by process_scenario's error paths.
+    
+    A scenario already in ERROR is left unchanged, unless clear_outputs is set (a failed
+    processing run always records its error and drops any stale output paths).
+    A failed commit is rolled back and logged rather than raised.
+    """
+    # Re-fetches after a rollback; otherwise served from the session's identity map
+    scenario = db.session.get(Scenario, scenario_id)
+    if not scenario:
+        logging.error(f"API Client: Scenario {scenario_id} was not found when trying to record error: {msg}")
+        return
+    if scenario.status == ProcessingStatus.ERROR and not clear_outputs:
+        return
+    scenario.status = ProcessingStatus.ERROR
+    # Be careful about error message length for status_message column
+    scenario.status_message = (msg[:250] + '...') if len(msg) > 253 else msg
+    if clear_outputs:
+        scenario.merged_csv_path = None
+        scenario.attin_txt_path = None
+    try:
+        db.session.commit()
+    except Exception as commit_e:
+        db.session.rollback()
+        logging.error(f"API Client: CRITICAL - Failed to commit ERROR status for scenario {scenario_id}. DB error: {commit_e}")
+
+@invalidates_read_cache
 def process_scenario(study_id: int, scenario_id: int) -> Tuple[Dict[str, Any], Optional[str]]:
     """Process a scenario via the API or database directly.
     
@@ -696,12 +756,10 @@ def process_scenario(study_id: int, scenario_id: int) -> Tuple[Dict[str, Any], O
     error = None
     
     # Check if we should use internal database calls (for production)
-    if current_app.config.get('USE_INTERNAL_API', False) and Scenario is not None:
+    if _use_internal_api():
         try:
-            # Import processing function and utilities
+            # Imported here so pandas is only loaded by processes that actually process data
             from traffic_app.processing import process_traffic_data
-            from traffic_app.utils import get_absolute_path, get_relative_path, get_scenario_folder_path
-            import os
             
             # Direct database operation instead of HTTP request
             scenario = db.session.get(Scenario, scenario_id)
@@ -716,6 +774,13 @@ def process_scenario(study_id: int, scenario_id: int) -> Tuple[Dict[str, Any], O
                 return data, error
             
             # Allow reprocessing from ERROR or COMPLETE state too
+            # A run that died in PROCESSING becomes ERROR here, so it can be started again
+            if fail_stale_processing(scenario):
+                try: 
+                    db.session.commit()
+                except Exception: 
+                    db.session.rollback()
+                    logging.error("Failed to update status to ERROR for stale processing")
             allowed_start_states = [ProcessingStatus.READY_TO_PROCESS, ProcessingStatus.ERROR, ProcessingStatus.COMPLETE]
             if scenario.status not in allowed_start_states:
                 error = f"Scenario not ready for processing. Current status: {scenario.status.name}. Must be READY, ERROR, or COMPLETE."
@@ -744,73 +809,57 @@ def process_scenario(study_id: int, scenario_id: int) -> Tuple[Dict[str, Any], O
                 output_dir_path = get_scenario_folder_path(study_id, scenario_id, folder_type="outputs")
                 
                 # Verify actual files exist
-                if not os.path.exists(am_path): 
+                missing_paths = find_missing_files([am_path, pm_path, attout_path])
+                if am_path in missing_paths: 
                     raise FileNotFoundError(f"AM file missing on disk: {scenario.am_csv_path}")
-                if not os.path.exists(pm_path): 
+                if pm_path in missing_paths: 
                     raise FileNotFoundError(f"PM file missing on disk: {scenario.pm_csv_path}")
-                if not os.path.exists(attout_path): 
+                if attout_path in missing_paths: 
                     raise FileNotFoundError(f"ATTOUT file missing on disk: {scenario.attout_txt_path}")
                     
             except FileNotFoundError as fnf_e:
                 logging.error(f"API Client: Required file not found on disk for scenario {scenario_id}: {fnf_e}")
-                if scenario.status != ProcessingStatus.ERROR:
-                    scenario.status = ProcessingStatus.ERROR
-                    scenario.status_message = f"File not found on disk: {os.path.basename(str(fnf_e).split(': ')[-1])}"
-                    try: 
-                        db.session.commit()
-                    except Exception: 
-                        db.session.rollback()
-                        logging.error("Failed to update status to ERROR for missing file")
+                _set_scenario_error(scenario_id, f"File not found on disk: {os.path.basename(str(fnf_e).split(': ')[-1])}")
                 error = f"File missing: {fnf_e}"
                 return data, error
             except ValueError as path_e:
                 logging.error(f"API Client: Error resolving output path for scenario {scenario_id}: {path_e}")
-                if scenario.status != ProcessingStatus.ERROR:
-                    scenario.status = ProcessingStatus.ERROR
-                    scenario.status_message = f"Path error: {str(path_e)}"
-                    try: 
-                        db.session.commit()
-                    except Exception: 
-                        db.session.rollback()
-                        logging.error("Failed to update status to ERROR for path issue")
+                _set_scenario_error(scenario_id, f"Path error: {str(path_e)}")
                 error = f"Internal path configuration error: {str(path_e)}"
                 return data, error
             except Exception as e:
                 logging.exception(f"API Client: Unexpected error setting up paths for scenario {scenario_id}: {e}")
-                if scenario.status != ProcessingStatus.ERROR:
-                    scenario.status = ProcessingStatus.ERROR
-                    scenario.status_message = f"Unexpected path setup error: {str(e)}"
-                    try: 
-                        db.session.commit()
-                    except Exception: 
-                        db.session.rollback()
-                        logging.error("Failed to update status to ERROR for path setup")
+                _set_scenario_error(scenario_id, f"Unexpected path setup error: {str(e)}")
                 error = f"Unexpected path setup error: {e}"
                 return data, error
             
             # --- Start Processing ---
-            scenario.status = ProcessingStatus.PROCESSING
-            scenario.status_message = "Processing started..."
-            # Clear previous output paths immediately
-            scenario.merged_csv_path = None
-            scenario.attin_txt_path = None
+            # The claim is committed before processing starts, so a concurrent request
+            # sees PROCESSING and is turned away instead of running the same scenario again
             try:
+                if not claim_scenario_for_processing(scenario):
+                    db.session.rollback()
+                    error = f"Scenario {scenario_id} is already being processed."
+                    return data, error
                 db.session.commit()
             except Exception as e:
+                # Nothing was claimed, so the status is left as it is; writing ERROR here
+                # could overwrite the result of a run another request has just finished
                 db.session.rollback()
                 logging.exception(f"API Client: Failed to update status to PROCESSING for scenario {scenario_id}")
-                # Re-fetch scenario in case commit failed but object changed
-                scenario = db.session.get(Scenario, scenario_id)
-                if scenario and scenario.status != ProcessingStatus.ERROR:
-                    scenario.status = ProcessingStatus.ERROR
-                    scenario.status_message = "Failed to set PROCESSING status in DB."
-                    try: 
-                        db.session.commit()
-                    except Exception: 
-                        db.session.rollback()
                 error = f"Database error before processing start: {e}"
                 return data, error
             
+            if current_app.config.get('PROCESS_IN_BACKGROUND'):
+                start_background_processing(study_id, scenario_id, scenario.processing_started_at, am_path, pm_path, attout_path, output_dir_path, scenario.name)
+                logging.info(f"API Client: Started background processing of scenario {scenario_id} (Study {study_id})")
+                data = {
+                    "message": "Scenario processing started.",
+                    "scenario_id": scenario.id,
+                    "status": scenario.status.name
+                }
+                return data, error
+            
             # --- Execute Core Logic ---
             try:
                 merged_path_abs, attin_path_abs = process_traffic_data(
@@ -837,24 +886,7 @@ def process_scenario(study_id: int, scenario_id: int) -> Tuple[Dict[str, Any], O
             except Exception as e:
                 # --- Failure ---
                 db.session.rollback()
-                # Re-fetch the scenario object within this exception handler's session context
-                scenario = db.session.get(Scenario, scenario_id)
-                if scenario:
-                    scenario.status = ProcessingStatus.ERROR
-                    # Be careful about error message length for status_message column
-                    error_msg = f"Processing failed: {str(e)}"
-                    scenario.status_message = (error_msg[:250] + '...') if len(error_msg) > 253 else error_msg
-                    # Ensure output paths are cleared on error
-                    scenario.merged_csv_path = None
-                    scenario.attin_txt_path = None
-                    try:
-                        db.session.commit()
-                    except Exception as commit_e:
-                        db.session.rollback()
-                        logging.error(f"API Client: CRITICAL - Failed to commit ERROR status for scenario {scenario_id} after processing failure. DB error: {commit_e}")
-                else:
-                    logging.error(f"API Client: Scenario {scenario_id} was not found when trying to record processing error.")
-                
+                _set_scenario_error(scenario_id, f"Processing failed: {str(e)}", clear_outputs=True)
                 logging.exception(f"API Client: Processing failed for scenario {scenario_id} (Study {study_id})")
                 error = f"Processing failed: {str(e)}"
                 return data, error
@@ -865,13 +897,14 @@ def process_scenario(study_id: int, scenario_id: int) -> Tuple[Dict[str, Any], O
             logging.error(f"API Client: Database error processing scenario {scenario_id}: {e}")
     else:
         # Original HTTP-based approach for development
-        api_url = url_for('api.process_scenario', study_id=study_id, scenario_id=scenario_id, _external=True)
+        api_url = _api_url('api.process_scenario', study_id=study_id, scenario_id=scenario_id)
         
         try:
-            response = requests.post(api_url)
-            data = response.json()
+            response = _http.post(api_url)
+            data = _json(response)
             
-            if response.status_code != 200:
+            # 202: processing was started in the background
+            if response.status_code not in (200, 202):
                 error = data.get('error', f'API Error {response.status_code}')
                 logging.error(f"API Client: API error during processing ({api_url}): {response.status_code} - {response.text}")
         except requests.RequestException as e:
@@ -883,6 +916,7 @@ def process_scenario(study_id: int, scenario_id: int) -> Tuple[Dict[str, Any], O
     
     return data, error
 
+@invalidates_read_cache
 def delete_configuration(study_id: int, config_id: int) -> Tuple[Dict[str, Any], Optional[str]]:
     """Delete a configuration via the API or database directly.
     
@@ -897,7 +931,7 @@ def delete_configuration(study_id: int, config_id: int) -> Tuple[Dict[str, Any],
     error = None
     
     # Check if we should use internal database calls (for production)
-    if current_app.config.get('USE_INTERNAL_API', False) and Configuration is not None:
+    if _use_internal_api():
         try:
             # Direct database operation instead of HTTP request
             config = db.session.get(Configuration, config_id)
@@ -905,9 +939,6 @@ def delete_configuration(study_id: int, config_id: int) -> Tuple[Dict[str, Any],
                 error = f"Configuration {config_id} not found in study {study_id}."
                 return data, error
             
-            # Import here to avoid circular imports
-            from .utils import delete_configuration_folders, delete_scenario_files, delete_scenario_folders
-            
             # Track deletion statistics
             total_scenarios = 0
             scenarios_deleted = []
@@ -921,18 +952,17 @@ def delete_configuration(study_id: int, config_id: int) -> Tuple[Dict[str, Any],
                 scenarios_deleted.append(scenario.id)
                 delete_scenario_files(scenario)
                 delete_scenario_folders(study_id, scenario.id)
-                db.session.delete(scenario)
             
             # Delete configuration folders
             delete_configuration_folders(study_id, config_id)
             
-            # Delete the configuration itself
-            db.session.delete(config)
+            # Delete the rows with one bulk DELETE per table instead of one per scenario
+            db.session.execute(delete(Scenario).where(Scenario.configuration_id == config_id))
+            db.session.execute(delete(Configuration).where(Configuration.id == config_id))
             db.session.commit()
             
-            # Clean up any remaining empty folders
-            from .utils import cleanup_all_empty_folders
-            cleanup_all_empty_folders()
+            # Clean up any remaining empty folders, off the request thread
+            schedule_empty_folder_cleanup()
             
             data = {
                 "message": "Configuration deleted successfully",
@@ -948,10 +978,10 @@ def delete_configuration(study_id: int, config_id: int) -> Tuple[Dict[str, Any],
             logging.error(f"API Client: Database error deleting configuration {config_id}: {e}")
     else:
         # Original HTTP-based approach for development
-        api_url = url_for('api.delete_configuration', study_id=study_id, config_id=config_id, _external=True)
+        api_url = _api_url('api.delete_configuration', study_id=study_id, config_id=config_id)
         try:
-            response = requests.delete(api_url)
-            data = response.json()
+            response = _http.delete(api_url)
+            data = _json(response)
             
             if response.status_code != 200:
                 error = data.get('error', f'Error deleting configuration (API Status: {response.status_code}).')
@@ -965,6 +995,7 @@ def delete_configuration(study_id: int, config_id: int) -> Tuple[Dict[str, Any],
     
     return data, error
 
+@invalidates_read_cache
 def delete_scenario(study_id: int, scenario_id: int) -> Tuple[Dict[str, Any], Optional[str]]:
     """Delete a scenario via the API or database directly.
     
@@ -979,7 +1010,7 @@ def delete_scenario(study_id: int, scenario_id: int) -> Tuple[Dict[str, Any], Op
     error = None
     
     # Check if we should use internal database calls (for production)
-    if current_app.config.get('USE_INTERNAL_API', False) and Scenario is not None:
+    if _use_internal_api():
         try:
             # Direct database operation instead of HTTP request
             scenario = db.session.get(Scenario, scenario_id)
@@ -993,9 +1024,6 @@ def delete_scenario(study_id: int, scenario_id: int) -> Tuple[Dict[str, Any], Op
                 error = f"Scenario {scenario_id} not found in study {study_id}."
                 return data, error
             
-            # Import here to avoid circular imports
-            from .utils import delete_scenario_files, delete_scenario_folders
-            
             # Store configuration ID for response
             configuration_id = scenario.configuration_id
             
@@ -1007,9 +1035,8 @@ def delete_scenario(study_id: int, scenario_id: int) -> Tuple[Dict[str, Any], Op
             db.session.delete(scenario)
             db.session.commit()
             
-            # Clean up any remaining empty folders
-            from .utils import cleanup_all_empty_folders
-            cleanup_all_empty_folders()
+            # Clean up any remaining empty folders, off the request thread
+            schedule_empty_folder_cleanup()
             
             data = {
                 "message": "Scenario deleted successfully",
@@ -1026,10 +1053,10 @@ def delete_scenario(study_id: int, scenario_id: int) -> Tuple[Dict[str, Any], Op
             logging.error(f"API Client: Database error deleting scenario {scenario_id}: {e}")
     else:
         # Original HTTP-based approach for development
-        api_url = url_for('api.delete_scenario', study_id=study_id, scenario_id=scenario_id, _external=True)
+        api_url = _api_url('api.delete_scenario', study_id=study_id, scenario_id=scenario_id)
         try:
-            response = requests.delete(api_url)
-            data = response.json()
+            response = _http.delete(api_url)
+            data = _json(response)
             
             if response.status_code != 200:
                 error = data.get('error', f'Error deleting scenario (API Status: {response.status_code}).')
@@ -1043,6 +1070,7 @@ def delete_scenario(study_id: int, scenario_id: int) -> Tuple[Dict[str, Any], Op
     
     return data, error
 
+@invalidates_read_cache
 def delete_study(study_id: int) -> Tuple[Dict[str, Any], Optional[str]]:
     """Delete a study via the API or database directly.
     
@@ -1056,7 +1084,7 @@ def delete_study(study_id: int) -> Tuple[Dict[str, Any], Optional[str]]:
     error = None
     
     # Check if we should use internal database calls (for production)
-    if current_app.config.get('USE_INTERNAL_API', False) and Study is not None:
+    if _use_internal_api():
         try:
             # Direct database operation instead of HTTP request
             study = db.session.get(Study, study_id)
@@ -1064,16 +1092,19 @@ def delete_study(study_id: int) -> Tuple[Dict[str, Any], Optional[str]]:
                 error = f"Study {study_id} not found."
                 return data, error
             
-            # Import here to avoid circular imports
-            from .utils import delete_study_folders
-            
             # Track deletion statistics
             total_configs = 0
             total_scenarios = 0
             configs_deleted = []
             
-            # Get all configurations for this study
-            configurations = Configuration.query.filter_by(study_id=study_id).all()
+            # Get all configurations for this study, loading every configuration's
+            # scenarios in one extra query instead of one query per configuration
+            configurations = (
+                Configuration.query
+                .filter_by(study_id=study_id)
+                .options(selectinload(Configuration.scenarios))
+                .all()
+            )
             total_configs = len(configurations)
             
             # Process each configuration
@@ -1081,32 +1112,29 @@ def delete_study(study_id: int) -> Tuple[Dict[str, Any], Optional[str]]:
                 config_id = config.id
                 configs_deleted.append(config_id)
                 
-                # Get all scenarios for this configuration
-                scenarios = Scenario.query.filter_by(configuration_id=config_id).all()
+                scenarios = config.scenarios
                 total_scenarios += len(scenarios)
                 
                 # Delete each scenario's files and folders
                 for scenario in scenarios:
-                    from .utils import delete_scenario_files, delete_scenario_folders
                     delete_scenario_files(scenario)
                     delete_scenario_folders(study_id, scenario.id)
-                    db.session.delete(scenario)
                 
                 # Delete configuration folders
-                from .utils import delete_configuration_folders
                 delete_configuration_folders(study_id, config_id)
-                db.session.delete(config)
             
             # Delete study folders
             delete_study_folders(study_id)
             
-            # Delete the study itself
-            db.session.delete(study)
+            # Delete the rows with one bulk DELETE per table (children first)
+            # instead of a DELETE per scenario and configuration
+            db.session.execute(delete(Scenario).where(Scenario.study_id == study_id))
+            db.session.execute(delete(Configuration).where(Configuration.study_id == study_id))
+            db.session.execute(delete(Study).where(Study.id == study_id))
             db.session.commit()
             
-            # Clean up any remaining empty folders
-            from .utils import cleanup_all_empty_folders
-            cleanup_all_empty_folders()
+            # Clean up any remaining empty folders, off the request thread
+            schedule_empty_folder_cleanup()
             
             data = {
                 "message": "Study deleted successfully",
@@ -1122,10 +1150,10 @@ def delete_study(study_id: int) -> Tuple[Dict[str, Any], Optional[str]]:
             logging.error(f"API Client: Database error deleting study {study_id}: {e}")
     else:
         # Original HTTP-based approach for development
-        api_url = url_for('api.delete_study', study_id=study_id, _external=True)
+        api_url = _api_url('api.delete_study', study_id=study_id)
         try:
-            response = requests.delete(api_url)
-            data = response.json()
+            response = _http.delete(api_url)
+            data = _json(response)
             
             if response.status_code != 200:
                 error = data.get('error', f'Error deleting study (API Status: {response.status_code}).')
@@ -1139,6 +1167,7 @@ def delete_study(study_id: int) -> Tuple[Dict[str, Any], Optional[str]]:
     
     return data, error
 
+@invalidates_read_cache
 def update_study(study_id: int, study_data: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
     """Update a study via the API or database directly.
     
@@ -1153,7 +1182,7 @@ def update_study(study_id: int, study_data: Dict[str, Any]) -> Tuple[Dict[str, A
     error = None
     
     # Check if we should use internal database calls (for production)
-    if current_app.config.get('USE_INTERNAL_API', False) and Study is not None:
+    if _use_internal_api():
         try:
             # Direct database operation instead of HTTP request
             study = db.session.get(Study, study_id)
@@ -1173,7 +1202,7 @@ def update_study(study_id: int, study_data: Dict[str, Any]) -> Tuple[Dict[str, A
                 "id": study.id,
                 "name": study.name,
                 "analyst_name": study.analyst_name,
-                "created_at": study.created_at.isoformat() if study.created_at else None,
+                "created_at": study.created_at,
                 "message": "Study updated successfully"
             }
             
@@ -1183,10 +1212,10 @@ def update_study(study_id: int, study_data: Dict[str, Any]) -> Tuple[Dict[str, A
             logging.error(f"API Client: Database error updating study {study_id}: {e}")
     else:
         # Original HTTP-based approach for development
-        api_url = url_for('api.update_study', study_id=study_id, _external=True)
+        api_url = _api_url('api.update_study', study_id=study_id)
         try:
-            response = requests.put(api_url, json=study_data)
-            data = response.json()
+            response = _http.put(api_url, data=orjson.dumps(study_data), headers=_JSON_HEADERS)
+            data = _json(response)
             
             if 'created_at' in data:
                 data['created_at'] = _parse_date(data['created_at'])
@@ -1203,6 +1232,7 @@ def update_study(study_id: int, study_data: Dict[str, Any]) -> Tuple[Dict[str, A
     
     return data, error
 
+@invalidates_read_cache
 def delete_scenario_file_api(study_id: int, scenario_id: int, file_type_id: str) -> Tuple[bool, Any]:
     """Calls the API to delete a specific uploaded file for a scenario.
     
@@ -1221,21 +1251,16 @@ def delete_scenario_file_api(study_id: int, scenario_id: int, file_type_id: str)
     success = False
     
     # Check if we should use internal database calls (for production)
-    if current_app.config.get('USE_INTERNAL_API', False) and Scenario is not None:
+    if _use_internal_api():
         try:
-            # Import required utilities
-            from .utils import get_absolute_path
-            import os
-            
             # Direct database operation instead of HTTP request
             scenario = db.session.get(Scenario, scenario_id)
             if not scenario:
                 error = f"Scenario {scenario_id} not found."
                 return False, error
             
-            # Verify the scenario belongs to the correct study
-            config = db.session.get(Configuration, scenario.configuration_id)
-            if not config or config.study_id != study_id:
+            # Verify the scenario belongs to the correct study (scenarios carry their study_id)
+            if scenario.study_id != study_id:
                 error = f"Scenario {scenario_id} not found for study {study_id}."
                 return False, error
             
@@ -1261,10 +1286,10 @@ def delete_scenario_file_api(study_id: int, scenario_id: int, file_type_id: str)
             else:
                 try:
                     file_path_absolute = get_absolute_path(file_path_relative)
-                    if os.path.exists(file_path_absolute):
-                        os.remove(file_path_absolute)
+                    try:
+                        os.unlink(file_path_absolute)
                         logging.info(f"API Client: Successfully deleted physical file: {file_path_absolute}")
-                    else:
+                    except FileNotFoundError:
                         logging.warning(f"API Client: DB path '{file_path_relative}' existed for {file_type_id} of scenario {scenario_id}, but file not on disk at '{file_path_absolute}'.")
                     
                     # Clear DB fields for this file type
@@ -1279,21 +1304,14 @@ def delete_scenario_file_api(study_id: int, scenario_id: int, file_type_id: str)
                     return False, error
             
             # Update scenario status - if it was READY, it might now be PENDING_FILES
-            if not all([scenario.am_csv_path, scenario.pm_csv_path, scenario.attout_txt_path]):
+            if not scenario.has_all_input_files:
                 if scenario.status == ProcessingStatus.READY_TO_PROCESS or scenario.status == ProcessingStatus.COMPLETE:
                     scenario.status = ProcessingStatus.PENDING_FILES
                     scenario.status_message = "One or more required files are now missing after deletion."
                     logging.info(f"API Client: Scenario {scenario_id} status updated to PENDING_FILES due to file deletion.")
             
-            try:
-                db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                error = f"Database error after file deletion: {str(e)}"
-                logging.error(f"API Client: Database error committing changes after file deletion for scenario {scenario_id}: {e}")
-                return False, error
-            
-            # Return the updated scenario status
+            # Build the updated scenario status before committing; the in-memory scenario
+            # already holds the new values, and commit would expire it and force a reload
             updated_uploaded_files_info = [
                 {
                     "file_type_id": "am_csv", 
@@ -1329,6 +1347,17 @@ def delete_scenario_file_api(study_id: int, scenario_id: int, file_type_id: str)
                 "has_attin": bool(scenario.attin_txt_path)
             }
             
+            # The cleared path/name columns and any status change go out as a single UPDATE.
+            # A repeated delete of an already-cleared file changes nothing; skip the commit then
+            if db.session.is_modified(scenario):
+                try:
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    error = f"Database error after file deletion: {str(e)}"
+                    logging.error(f"API Client: Database error committing changes after file deletion for scenario {scenario_id}: {e}")
+                    return False, error
+            
             success = True
             logging.info(f"API Client: Successfully deleted file '{file_type_id}' for scenario {scenario_id}.")
             
@@ -1338,19 +1367,18 @@ def delete_scenario_file_api(study_id: int, scenario_id: int, file_type_id: str)
             logging.error(f"API Client: Database error during file deletion for scenario {scenario_id}: {e}")
     else:
         # Original HTTP-based approach for development
-        api_url = url_for('api.delete_scenario_file_typed', 
+        api_url = _api_url('api.delete_scenario_file_typed', 
                             study_id=study_id, 
                             scenario_id=scenario_id, 
-                            file_type_id=file_type_id, 
-                            _external=True)
+                            file_type_id=file_type_id)
         
         logging.info(f"API Client: Attempting to DELETE file '{file_type_id}' for scenario {scenario_id} via {api_url}")
         
         try:
-            response = requests.delete(api_url)
+            response = _http.delete(api_url)
             
             if response.status_code == 200: # Expecting 200 OK with updated scenario data
-                response_data = response.json()
+                response_data = _json(response)
                 logging.info(f"API Client: Successfully deleted file '{file_type_id}'. API response: {response_data}")
                 success = True
             elif response.status_code == 204: # No Content is also a valid success for DELETE if no body is returned
@@ -1358,7 +1386,7 @@ def delete_scenario_file_api(study_id: int, scenario_id: int, file_type_id: str)
                 error = f"File deleted, but API returned 204 No Content instead of updated scenario data."
             else:
                 try:
-                    error_payload = response.json()
+                    error_payload = _json(response)
                     error = error_payload.get('error', f'API error during file deletion (Status: {response.status_code})')
                 except ValueError: # If response is not JSON
                     error = f'API error during file deletion (Status: {response.status_code}, Response: {response.text[:200]})'
@@ -0,0 +1,68 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Small shared pool for janitorial work (file cleanup) that should not hold up a response
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='trafficapp-bg')
+
+# Worker processes for CPU-bound work (scenario processing), created on first use
+PROCESS_POOL_WORKERS = os.cpu_count() or 1
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+# Pending debounced tasks, keyed by the caller's task key
+_debounce_timers = {}
+_debounce_lock = threading.Lock()
+
+def _run_logged(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    except Exception as e:
+        logging.error(f"Background task {func.__name__} failed: {e}")
+
+def run_in_background(func, *args, **kwargs):
+    """Run func(*args, **kwargs) on the background pool, logging any failure.
+
+    The task runs outside the request and app context, so it must not touch
+    current_app or the database session.
+    """
+    return _executor.submit(_run_logged, func, args, kwargs)
+
+def run_debounced(key, delay, func, *args, **kwargs):
+    """Run func in the background once no call with the same key came in for delay seconds.
+
+    A burst of calls (e.g. several deletes in a row) results in a single run.
+    """
+    def fire():
+        with _debounce_lock:
+            # Only drop the entry if a newer call has not replaced this timer
+            if _debounce_timers.get(key) is threading.current_thread():
+                del _debounce_timers[key]
+        _run_logged(func, args, kwargs)
+
+    with _debounce_lock:
+        pending = _debounce_timers.get(key)
+        if pending is not None:
+            pending.cancel()
+        timer = threading.Timer(delay, fire)
+        timer.daemon = True
+        _debounce_timers[key] = timer
+        timer.start()
+
+def run_in_process_pool(func, *args):
+    """Run a CPU-bound func(*args) in a worker process and return its Future.
+
+    func and its arguments must be picklable, and func must not rely on an
+    app context. Workers are spawned rather than forked, so they never inherit
+    the parent's database connections or threads.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=PROCESS_POOL_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+    return _process_pool.submit(func, *args)
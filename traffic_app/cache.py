@@ -0,0 +1,63 @@
+import copy
+import functools
+import logging
+import threading
+import time
+from flask import current_app
+
+# Guards the per-app cache dicts; gunicorn's threaded workers may share them
+_lock = threading.Lock()
+
+def _get_cache() -> dict:
+    """Return the read cache of the current app, creating it on first use."""
+    return current_app.extensions.setdefault('api_read_cache', {})
+
+def cached_read(func):
+    """Cache a (data, error) returning reader for API_CACHE_TTL seconds.
+
+    Results are keyed on the function name and its arguments, and only
+    successful results are stored. If a refresh fails, the last good result
+    is served instead, as long as it is younger than API_CACHE_STALE_TTL.
+    A TTL of 0 disables caching. The cache is per process: invalidation
+    does not reach other gunicorn workers.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        ttl = current_app.config.get('API_CACHE_TTL', 0)
+        if not ttl:
+            return func(*args, **kwargs)
+
+        cache = _get_cache()
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+        with _lock:
+            entry = cache.get(key)
+
+        # Callers may modify the returned lists/dicts, so always hand out copies
+        if entry and now - entry[0] < ttl:
+            return copy.deepcopy(entry[1])
+
+        result = func(*args, **kwargs)
+        if result[-1] is None:
+            with _lock:
+                cache[key] = (now, copy.deepcopy(result))
+        elif entry and now - entry[0] < current_app.config.get('API_CACHE_STALE_TTL', 0):
+            logging.warning(f"API Client: {func.__name__} failed ({result[-1]}), serving cached result")
+            return copy.deepcopy(entry[1])
+        return result
+    return wrapper
+
+def invalidate_read_cache():
+    """Drop all cached reads of the current app (call after any write)."""
+    with _lock:
+        _get_cache().clear()
+
+def invalidates_read_cache(func):
+    """Decorator for writers: clear the read cache once the write has run."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            invalidate_read_cache()
+    return wrapper
@@ -1,9 +1,28 @@
 import os
 import secrets
-from typing import Optional
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
+# PostgreSQL URI query parameters passed to the driver as connect_args
+CONNECT_ARG_PARAMS = ('sslmode', 'sslrootcert', 'sslcert', 'sslkey', 'connect_timeout')
+
+# Engine options that only apply to a connection pool (QueuePool); they must be dropped
+# when an app is built with poolclass=NullPool, which rejects pool_use_lifo and friends.
+# Keep in sync with the pool settings in the SQLALCHEMY_ENGINE_OPTIONS below
+QUEUEPOOL_ONLY_KEYS = ('pool_size', 'max_overflow', 'pool_timeout', 'pool_use_lifo', 'pool_recycle')
+
+# Columns added to the models after the initial schema: (table, column, definition).
+# Used by both the startup schema check (create_app) and migrate.py, so a new model
+# column only needs to be listed here
+SCHEMA_COLUMN_FIXES = (
+    ('configuration', 'trip_assign_count', 'INTEGER DEFAULT 1 NOT NULL'),
+    ('scenario', 'order_index', 'INTEGER DEFAULT 0 NOT NULL'),
+    ('scenario', 'processing_started_at', 'TIMESTAMP'),
+)
+
 class Config:
     """Base configuration class with common settings."""
     
@@ -43,12 +62,41 @@ class Config:
         os.makedirs(os.path.dirname(sqlite_path), exist_ok=True)
         return f'sqlite:///{sqlite_path}'
     
+    @classmethod
+    @lru_cache(maxsize=None)
+    def get_database_settings(cls) -> Tuple[str, Dict[str, Any]]:
+        """Get the database URI and driver connect_args, resolved once per process.
+        
+        libpq connection options (sslmode, sslrootcert, connect_timeout, ...) are
+        moved out of the URI into connect_args; other query parameters stay in
+        the URI. Call get_database_settings.cache_clear() after changing DATABASE_URL.
+        """
+        db_uri = cls.get_database_uri()
+        parts = urlsplit(db_uri)
+        if not parts.scheme.startswith('postgresql'):
+            return db_uri, {}
+        
+        query = parse_qsl(parts.query)
+        connect_args = {key: value for key, value in query if key in CONNECT_ARG_PARAMS}
+        remaining_query = [(key, value) for key, value in query if key not in CONNECT_ARG_PARAMS]
+        db_uri = urlunsplit(parts._replace(query=urlencode(remaining_query)))
+        
+        connect_args.setdefault('sslmode', 'require')
+        connect_args.setdefault('connect_timeout', 10)
+        # Identifies this process in pg_stat_activity and the server logs
+        connect_args.setdefault('application_name', f'trafficstudyapp-{os.getpid()}')
+        return db_uri, connect_args
+    
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_pre_ping': True,  # Verify connections before use
         'pool_recycle': 300,    # Recycle connections every 5 minutes
     }
 
+    # Register Flask-Migrate outside the `flask db` commands (migrate.py sets this);
+    # web workers leave it off so Alembic is never imported on their boot path
+    ENABLE_MIGRATIONS = os.environ.get('ENABLE_MIGRATIONS', 'False').lower() == 'true'
+
     # File storage configuration
     USE_CLOUDINARY = os.environ.get('USE_CLOUDINARY', 'False').lower() == 'true'
     
@@ -61,9 +109,34 @@ class Config:
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
     OUTPUT_FOLDER = os.path.join(BASE_DIR, 'outputs')
     ALLOWED_EXTENSIONS = {'csv', 'txt'}
+    
+    # Uploads written to disk at the same time per worker process; the rest wait their turn
+    MAX_CONCURRENT_UPLOADS = int(os.environ.get('MAX_CONCURRENT_UPLOADS', '8'))
 
     LOGGING_LEVEL = 'DEBUG'
     LOGGING_FORMAT = '%(asctime)s - %(levelname)s - [%(funcName)s] - %(message)s'
+    
+    # Seconds to cache api_client reads (0 disables), and how long a cached result
+    # may still be served when a refresh fails. The cache lives in each worker process
+    # and writes only clear their own worker's copy, so only enable it when the app runs
+    # as a single worker process; with several, the others serve stale lists for the TTL
+    API_CACHE_TTL = int(os.environ.get('API_CACHE_TTL', '0'))
+    API_CACHE_STALE_TTL = int(os.environ.get('API_CACHE_STALE_TTL', '300'))
+    
+    # Base URL (e.g. http://127.0.0.1:5000) for api_client's HTTP calls; when set, endpoint
+    # URLs are built from cached path templates instead of url_for(..., _external=True)
+    API_BASE_URL = os.environ.get('API_BASE_URL')
+    
+    # Run scenario processing in worker processes and answer the process request right
+    # away (status PROCESSING); the results show up once the scenario page is reloaded
+    PROCESS_IN_BACKGROUND = os.environ.get('PROCESS_IN_BACKGROUND', 'False').lower() == 'true'
+    
+    # Seconds after which a scenario still in PROCESSING is treated as failed (its
+    # worker died before recording a result) so it can be processed again
+    PROCESSING_TIMEOUT = int(os.environ.get('PROCESSING_TIMEOUT', '1800'))
+    
+    # Log elapsed time after each create_app phase to find slow startup steps
+    PROFILE_BOOT = os.environ.get('PROFILE_BOOT', 'False').lower() == 'true'
 
 
 class DevelopmentConfig(Config):
@@ -116,10 +189,12 @@ class ProductionConfig(Config):
     LOGGING_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
     
     # Performance optimizations
+    SEND_FILE_MAX_AGE_DEFAULT = 3600  # Let browsers cache static assets (CSS/JS) for 1 hour
     SQLALCHEMY_ENGINE_OPTIONS = {
         **Config.SQLALCHEMY_ENGINE_OPTIONS,
         'pool_size': 10,
         'max_overflow': 20,
+        'pool_use_lifo': True,  # Reuse the most recently returned (warm) connection first
     }
     
     @classmethod
@@ -1,11 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
 
-# Configure SQLAlchemy with engine options for better connection handling
-db = SQLAlchemy(engine_options={
-    'pool_pre_ping': True,
-    'pool_recycle': 300,
-    'connect_args': {
-        'sslmode': 'require',
-        'connect_timeout': 10
-    }
-})
\ No newline at end of file
+# Engine options (pooling, pre-ping, connect_args) come from the config's
+# SQLALCHEMY_ENGINE_OPTIONS, built in create_app, so there is a single source of truth
+db = SQLAlchemy()
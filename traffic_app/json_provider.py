@@ -0,0 +1,54 @@
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date
+import orjson
+from flask.json.provider import JSONProvider
+from werkzeug.http import http_date
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Output matches Flask's default provider: keys are sorted and dates are
+    written as HTTP dates (RFC 822), e.g. 'Wed, 21 Oct 2015 07:28:00 GMT'.
+    Calls that pass json.dumps/json.loads keyword arguments (indent=,
+    default=, ...) are handed to the stdlib json module so they are honoured.
+    """
+    option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    @staticmethod
+    def _default(o):
+        # Same conversions as Flask's default provider; datetimes are passed through
+        # to here so they keep Flask's HTTP date format instead of orjson's ISO 8601
+        if isinstance(o, date):
+            return http_date(o)
+        if isinstance(o, (decimal.Decimal, uuid.UUID)):
+            return str(o)
+        if dataclasses.is_dataclass(o) and not isinstance(o, type):
+            return dataclasses.asdict(o)
+        if hasattr(o, '__html__'):
+            return str(o.__html__())
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+    def _dumpb(self, obj, pretty=False):
+        option = self.option | orjson.OPT_INDENT_2 if pretty else self.option
+        return orjson.dumps(obj, default=self._default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            kwargs.setdefault('default', self._default)
+            kwargs.setdefault('sort_keys', True)
+            return json.dumps(obj, **kwargs)
+        return self._dumpb(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Pretty-print in debug mode, like Flask's default provider
+        body = self._dumpb(obj, pretty=self._app.debug)
+        return self._app.response_class(body + b"\n", mimetype="application/json")
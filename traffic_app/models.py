@@ -14,6 +14,17 @@ class ProcessingStatus(enum.Enum):
     COMPLETE = "COMPLETE"
     ERROR = "ERROR"
 
+# Enum .name/.value are descriptor lookups; per-row serialization uses these tables instead
+STATUS_NAMES = {status: status.name for status in ProcessingStatus}
+STATUS_VALUES = {status: status.value for status in ProcessingStatus}
+
+# Statuses that move to READY_TO_PROCESS once all input files are uploaded
+# (a scenario that is PROCESSING keeps its status)
+READY_AFTER_UPLOAD_STATUSES = frozenset({
+    ProcessingStatus.PENDING_CONFIG, ProcessingStatus.PENDING_FILES,
+    ProcessingStatus.COMPLETE, ProcessingStatus.ERROR,
+})
+
 class Study(db.Model):
     __tablename__ = 'study'
     id: Mapped[int] = mapped_column(db.Integer, primary_key=True)
@@ -34,6 +45,8 @@ class Study(db.Model):
 
 class Configuration(db.Model):
     __tablename__ = 'configuration'
+    # Configuration names are unique per study; the index also serves the duplicate check
+    __table_args__ = (db.UniqueConstraint('study_id', 'name', name='uq_configuration_study_id_name'),)
     id: Mapped[int] = mapped_column(db.Integer, primary_key=True)
     name: Mapped[str] = mapped_column(db.String(100), nullable=False)
     phases_n: Mapped[int] = mapped_column(db.Integer, default=0)
@@ -66,6 +79,9 @@ class Scenario(db.Model):
     order_index: Mapped[int] = mapped_column(db.Integer, default=0, nullable=False)
     created_at: Mapped[datetime] = mapped_column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # When the last processing run was started; a PROCESSING status older than
+    # PROCESSING_TIMEOUT means the run died without recording a result
+    processing_started_at: Mapped[Optional[datetime]] = mapped_column(db.DateTime, nullable=True)
 
     am_csv_path: Mapped[Optional[str]] = mapped_column(db.String(255), nullable=True)
     pm_csv_path: Mapped[Optional[str]] = mapped_column(db.String(255), nullable=True)
@@ -86,6 +102,11 @@ class Scenario(db.Model):
     def __repr__(self):
         return f"<Scenario {self.id}: {self.name} (Study {self.study_id}, Config {self.configuration_id})>"
 
+    @property
+    def has_all_input_files(self):
+        """True once the AM CSV, PM CSV and ATTOUT TXT inputs are all uploaded."""
+        return bool(self.am_csv_path and self.pm_csv_path and self.attout_txt_path)
+
     def has_file(self, file_type):
         """Check if a specific file type exists for this scenario.
 
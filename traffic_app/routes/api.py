@@ -1,11 +1,12 @@
 import os
 import logging
 from flask import Blueprint, request, jsonify, abort, send_from_directory, current_app
+from sqlalchemy import delete, exists, insert, select
+from sqlalchemy.orm import selectinload
 from werkzeug.utils import secure_filename
 from ..extensions import db 
-from ..models import Study, Scenario, Configuration, ProcessingStatus
+from ..models import Study, Scenario, Configuration, ProcessingStatus, READY_AFTER_UPLOAD_STATUSES, STATUS_NAMES, STATUS_VALUES
 from ..utils import get_scenario_folder_path
-from traffic_app.processing import process_traffic_data
 from ..utils import (
     validate_file_extension, 
     save_uploaded_file, 
@@ -13,16 +14,30 @@ from ..utils import (
     get_absolute_path, 
     get_relative_path, 
     get_download_info,
+    find_missing_files,
     delete_scenario_files, 
     delete_scenario_folders, 
     delete_configuration_folders, 
     delete_study_folders,
-    cleanup_all_empty_folders
+    schedule_empty_folder_cleanup,
+    build_scenario_names,
+    parse_configuration_request,
+    delete_replaced_file_later,
+    start_background_processing,
+    fail_stale_processing,
+    get_reported_status,
+    claim_scenario_for_processing
 )
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
 
+@api_bp.route('/health', methods=['GET'])
+def health_check():
+    """API Endpoint: Liveness check for the load balancer. Returns immediately without touching the database."""
+    return "OK", 200
+
+
 @api_bp.route('/studies', methods=['GET', 'POST'])
 def studies():
     """API Endpoint: Get list of studies or create a new study."""
@@ -58,7 +73,14 @@ def studies():
     else:
         try:
             # Order by created_at in descending order (newest first)
-            study_objects = Study.query.order_by(Study.created_at.desc()).all()
+            # Load configurations and their scenarios up front (one extra query per level)
+            # instead of lazy-loading them per study and per configuration
+            study_objects = (
+                Study.query
+                .options(selectinload(Study.configurations).selectinload(Configuration.scenarios))
+                .order_by(Study.created_at.desc())
+                .all()
+            )
             studies = []
             for s in study_objects:
                 study_dict = {
@@ -67,7 +89,8 @@ def studies():
                     "analyst_name": s.analyst_name,
                     "created_at": s.created_at.isoformat() if s.created_at else None,
                     "configurations_count": len(s.configurations),
-                    "scenarios_count": len(s.scenarios),
+                    # Every scenario belongs to one of the study's configurations
+                    "scenarios_count": sum(len(config.scenarios) for config in s.configurations),
                     "configurations": []
                 }
                 # Add full configuration and scenario data for status calculation
@@ -81,7 +104,7 @@ def studies():
                         scenario_dict = {
                             "id": scenario.id,
                             "name": scenario.name,
-                            "status": {"value": scenario.status.value}
+                            "status": {"value": STATUS_VALUES[scenario.status]}
                         }
                         config_dict["scenarios"].append(scenario_dict)
                     study_dict["configurations"].append(config_dict)
@@ -123,94 +146,41 @@ def configure_study(study_id):
     if not study:
         return jsonify({"error": f"Study {study_id} not found."}), 404
 
-    data = request.get_json()
-    if not data or 'phases_n' not in data or 'config_name' not in data:
-        return jsonify({"error": "'phases_n' and 'config_name' required"}), 400
-    try:
-        n = int(data['phases_n'])
-        assert n >= 0
-    except (ValueError, AssertionError):
-        return jsonify({"error": "Invalid 'phases_n', must be a non-negative integer."}), 400
-
-    config_name = data['config_name'].strip()
-    if not config_name:
-        return jsonify({"error": "'config_name' cannot be empty"}), 400
+    fields, error = parse_configuration_request(request.get_json())
+    if error:
+        return jsonify({"error": error}), 400
+    config_name = fields['name']
 
     # Check if configuration name already exists for this study
-    existing_config = Configuration.query.filter_by(study_id=study_id, name=config_name).first()
-    if existing_config:
+    # EXISTS returns a single boolean instead of loading a full Configuration row
+    name_taken = db.session.execute(
+        select(exists().where(Configuration.study_id == study_id, Configuration.name == config_name))
+    ).scalar()
+    if name_taken:
         return jsonify({"error": f"Configuration name '{config_name}' already exists for this study"}), 400
 
-    def get_b(p): return data.get(p, False) is True
-    incl = {k: get_b(k) for k in ['include_bg_dist', 'include_bg_assign', 'include_trip_dist', 'include_trip_assign']}
-
-    # Get trip distribution count if trip distribution is included
-    trip_dist_count = 1
-    if incl['include_trip_dist'] and 'trip_dist_count' in data:
-        try:
-            trip_dist_count = int(data['trip_dist_count'])
-            if trip_dist_count < 1:
-                trip_dist_count = 1
-        except (ValueError, TypeError):
-            trip_dist_count = 1
-
-    # Get trip assignment count if trip assignment is included
-    trip_assign_count = 1
-    if incl['include_trip_assign'] and 'trip_assign_count' in data:
-        try:
-            trip_assign_count = int(data['trip_assign_count'])
-            if trip_assign_count < 1:
-                trip_assign_count = 1
-        except (ValueError, TypeError):
-            trip_assign_count = 1
-
     try:
         # Create a new configuration
-        new_config = Configuration(
-            study_id=study_id,
-            name=config_name,
-            phases_n=n,
-            include_bg_dist=incl['include_bg_dist'],
-            include_bg_assign=incl['include_bg_assign'],
-            include_trip_dist=incl['include_trip_dist'],
-            trip_dist_count=trip_dist_count,
-            include_trip_assign=incl['include_trip_assign'],
-            trip_assign_count=trip_assign_count
-        )
+        new_config = Configuration(study_id=study_id, **fields)
         db.session.add(new_config)
         db.session.flush()  # Get the new configuration ID
 
         # Create scenarios for this configuration
-        scenarios_to_add = [Scenario(study_id=study.id, configuration_id=new_config.id, name='Existing', status=ProcessingStatus.PENDING_FILES)]
-        for i in range(1, n + 1):
-            scenarios_to_add.append(Scenario(study_id=study.id, configuration_id=new_config.id, name=f'No_Build_Phase_{i}', status=ProcessingStatus.PENDING_FILES))
-            scenarios_to_add.append(Scenario(study_id=study.id, configuration_id=new_config.id, name=f'Build_Phase_{i}', status=ProcessingStatus.PENDING_FILES))
-            if incl['include_bg_dist']: scenarios_to_add.append(Scenario(study_id=study.id, configuration_id=new_config.id, name=f'BG_Dev_Distribution_Phase_{i}', status=ProcessingStatus.PENDING_FILES))
-            if incl['include_bg_assign']: scenarios_to_add.append(Scenario(study_id=study.id, configuration_id=new_config.id, name=f'BG_Dev_Assignment_Phase_{i}', status=ProcessingStatus.PENDING_FILES))
-
-            # Create multiple trip distribution scenarios if needed
-            if incl['include_trip_dist']:
-                for j in range(1, trip_dist_count + 1):
-                    # If there's only one trip distribution, don't add a number suffix
-                    if trip_dist_count == 1:
-                        scenarios_to_add.append(Scenario(study_id=study.id, configuration_id=new_config.id, name=f'Trip_Distribution_Phase_{i}', status=ProcessingStatus.PENDING_FILES))
-                    else:
-                        scenarios_to_add.append(Scenario(study_id=study.id, configuration_id=new_config.id, name=f'Trip_Distribution_{j}_Phase_{i}', status=ProcessingStatus.PENDING_FILES))
-
-            # Create multiple trip assignment scenarios if needed
-            if incl['include_trip_assign']:
-                for j in range(1, trip_assign_count + 1):
-                    # If there's only one trip assignment, don't add a number suffix
-                    if trip_assign_count == 1:
-                        scenarios_to_add.append(Scenario(study_id=study.id, configuration_id=new_config.id, name=f'Trip_Assignment_Phase_{i}', status=ProcessingStatus.PENDING_FILES))
-                    else:
-                        scenarios_to_add.append(Scenario(study_id=study.id, configuration_id=new_config.id, name=f'Trip_Assignment_{j}_Phase_{i}', status=ProcessingStatus.PENDING_FILES))
-
-        db.session.add_all(scenarios_to_add)
+        scenario_names = build_scenario_names(fields['phases_n'], fields, fields['trip_dist_count'], fields['trip_assign_count'])
+
+        # Insert all scenarios with one batched INSERT; RETURNING hands back the new ids
+        # without per-object flushes or post-commit refreshes
+        scenario_rows = db.session.execute(
+            insert(Scenario).returning(Scenario.id, Scenario.name, Scenario.status),
+            [
+                {'study_id': study.id, 'configuration_id': new_config.id, 'name': name, 'status': ProcessingStatus.PENDING_FILES}
+                for name in scenario_names
+            ]
+        ).all()
         db.session.commit()
 
-        logging.info(f"API: Created configuration '{config_name}' for study {study_id} with {len(scenarios_to_add)} scenarios.")
-        s_list = [{"id": s.id, "name": s.name, "status": s.status.name} for s in scenarios_to_add]
+        logging.info(f"API: Created configuration '{config_name}' for study {study_id} with {len(scenario_rows)} scenarios.")
+        s_list = [{"id": row.id, "name": row.name, "status": STATUS_NAMES[row.status]} for row in sorted(scenario_rows, key=lambda row: row.id)]
         return jsonify({
             "message": "Configuration created",
             "configuration": {
@@ -241,18 +211,24 @@ def get_scenarios(study_id):
     configuration_id = request.args.get('configuration_id', type=int)
 
     try:
-        query = Scenario.query.filter_by(study_id=study_id)
+        # Select only the needed columns; no ORM instances are built
+        query = select(
+            Scenario.id, Scenario.name, Scenario.status, Scenario.status_message, Scenario.configuration_id,
+            Scenario.am_csv_path, Scenario.pm_csv_path, Scenario.attout_txt_path,
+            Scenario.merged_csv_path, Scenario.attin_txt_path
+        ).where(Scenario.study_id == study_id)
 
         # Filter by configuration_id if provided
         if configuration_id:
-            query = query.filter_by(configuration_id=configuration_id)
+            query = query.where(Scenario.configuration_id == configuration_id)
 
-        # Order by creation time to maintain original order
-        scenarios = query.order_by(Scenario.created_at.asc()).all()
+        # Order by creation time to maintain original order; rows are fetched in
+        # batches (a server-side cursor on PostgreSQL) rather than all at once
+        scenarios = db.session.execute(query.order_by(Scenario.created_at.asc()).execution_options(yield_per=200))
         scenario_list = [{
                 "id": s.id,
                 "name": s.name,
-                "status": s.status.name,
+                "status": STATUS_NAMES[s.status],
                 "status_message": s.status_message,
                 "configuration_id": s.configuration_id,
                 "has_am_csv": bool(s.am_csv_path),
@@ -303,16 +279,8 @@ def upload_scenario_file(study_id, scenario_id):
         existing_file_path_relative = scenario.attout_txt_path
         scenario.attout_txt_path = None
     
-    if existing_file_path_relative:
-        try:
-            existing_file_path_absolute = get_absolute_path(existing_file_path_relative)
-            if os.path.exists(existing_file_path_absolute):
-                os.remove(existing_file_path_absolute)
-                logging.info(f"API: Deleted existing file '{existing_file_path_absolute}' for scenario {scenario_id}, type {file_type}.")
-            else:
-                logging.warning(f"API: Existing file path '{existing_file_path_relative}' found in DB for scenario {scenario_id} (type {file_type}), but file not found at '{existing_file_path_absolute}'.")
-        except Exception as e:
-            logging.error(f"API: Error deleting existing file '{existing_file_path_relative}' for scenario {scenario_id}: {e}")
+    # The replaced file is deleted in the background once the new one is committed
+    existing_file_path_absolute = get_absolute_path(existing_file_path_relative)
 
     try:
         # Save the file and get the relative path
@@ -333,13 +301,12 @@ def upload_scenario_file(study_id, scenario_id):
             scenario.attout_txt_original_name = original_filename
 
         # Update status based on whether all required files are now present
-        all_files_present = all([scenario.am_csv_path, scenario.pm_csv_path, scenario.attout_txt_path])
+        all_files_present = scenario.has_all_input_files
 
         if all_files_present:
             # Only change status to READY if it's currently PENDING or was previously COMPLETE/ERROR
             # Don't change if it's currently PROCESSING.
-            if scenario.status in [ProcessingStatus.PENDING_CONFIG, ProcessingStatus.PENDING_FILES,
-                                   ProcessingStatus.COMPLETE, ProcessingStatus.ERROR]:
+            if scenario.status in READY_AFTER_UPLOAD_STATUSES:
                 scenario.status = ProcessingStatus.READY_TO_PROCESS
                 scenario.status_message = "All input files uploaded. Ready to process."
         else:
@@ -349,8 +316,9 @@ def upload_scenario_file(study_id, scenario_id):
                  scenario.status_message = "Waiting for other input file(s)."
 
         db.session.commit()
+        delete_replaced_file_later(existing_file_path_absolute, get_absolute_path(relative_save_path))
         return jsonify({
-            "message": f"File '{secure_filename(file.filename)}' uploaded successfully for type '{file_type}'.",
+            "message": f"File '{original_filename}' uploaded successfully for type '{file_type}'.",
             "saved_filename": filename,
             "scenario_status": scenario.status.name
         }), 200
@@ -369,6 +337,10 @@ def process_scenario(study_id, scenario_id):
         return jsonify({"error": f"Scenario {scenario_id} not found for study {study_id}."}), 404
 
     # Allow reprocessing from ERROR or COMPLETE state too
+    # A run that died in PROCESSING becomes ERROR here, so it can be started again
+    if fail_stale_processing(scenario):
+        try: db.session.commit()
+        except Exception: db.session.rollback(); logging.error("Failed to update status to ERROR for stale processing")
     allowed_start_states = [ProcessingStatus.READY_TO_PROCESS, ProcessingStatus.ERROR, ProcessingStatus.COMPLETE]
     if scenario.status not in allowed_start_states:
         return jsonify({"error": f"Scenario not ready for processing. Current status: {scenario.status.name}. Must be READY, ERROR, or COMPLETE."}), 409 # Conflict or Bad State
@@ -392,9 +364,10 @@ def process_scenario(study_id, scenario_id):
         output_dir_path = get_scenario_folder_path(study_id, scenario_id, folder_type="outputs")
 
         # Verify actual files exist
-        if not os.path.exists(am_path): raise FileNotFoundError(f"AM file missing on disk: {scenario.am_csv_path}")
-        if not os.path.exists(pm_path): raise FileNotFoundError(f"PM file missing on disk: {scenario.pm_csv_path}")
-        if not os.path.exists(attout_path): raise FileNotFoundError(f"ATTOUT file missing on disk: {scenario.attout_txt_path}")
+        missing_paths = find_missing_files([am_path, pm_path, attout_path])
+        if am_path in missing_paths: raise FileNotFoundError(f"AM file missing on disk: {scenario.am_csv_path}")
+        if pm_path in missing_paths: raise FileNotFoundError(f"PM file missing on disk: {scenario.pm_csv_path}")
+        if attout_path in missing_paths: raise FileNotFoundError(f"ATTOUT file missing on disk: {scenario.attout_txt_path}")
 
     except FileNotFoundError as fnf_e:
          logging.error(f"API: Required file not found on disk for scenario {scenario_id}: {fnf_e}")
@@ -423,28 +396,33 @@ def process_scenario(study_id, scenario_id):
 
 
     # --- Start Processing ---
-    scenario.status = ProcessingStatus.PROCESSING
-    scenario.status_message = "Processing started..."
-    # Clear previous output paths immediately
-    scenario.merged_csv_path = None
-    scenario.attin_txt_path = None
+    # The claim is committed before processing starts, so a concurrent request
+    # sees PROCESSING and is turned away instead of running the same scenario again
     try:
+        if not claim_scenario_for_processing(scenario):
+            db.session.rollback()
+            return jsonify({"error": f"Scenario {scenario_id} is already being processed."}), 409
         db.session.commit()
     except Exception as e:
+        # Nothing was claimed, so the status is left as it is; writing ERROR here
+        # could overwrite the result of a run another request has just finished
         db.session.rollback()
         logging.exception(f"API: Failed to update status to PROCESSING for scenario {scenario_id}")
-        # Re-fetch scenario in case commit failed but object changed
-        scenario = db.session.get(Scenario, scenario_id)
-        if scenario and scenario.status != ProcessingStatus.ERROR:
-             scenario.status = ProcessingStatus.ERROR # Mark as error if we can't even start
-             scenario.status_message = "Failed to set PROCESSING status in DB."
-             try: db.session.commit()
-             except Exception: db.session.rollback()
         return jsonify({"error": f"Database error before processing start: {e}"}), 500
 
+    if current_app.config.get('PROCESS_IN_BACKGROUND'):
+        start_background_processing(study_id, scenario_id, scenario.processing_started_at, am_path, pm_path, attout_path, output_dir_path, scenario.name)
+        logging.info(f"API: Started background processing of scenario {scenario_id} (Study {study_id})")
+        return jsonify({
+            "message": "Scenario processing started.",
+            "scenario_id": scenario.id,
+            "status": scenario.status.name
+        }), 202
 
     # --- Execute Core Logic ---
     try:
+        # Imported here so pandas is only loaded by processes that actually process data
+        from traffic_app.processing import process_traffic_data
         merged_path_abs, attin_path_abs = process_traffic_data(
             am_path, pm_path, attout_path, output_dir_path, scenario.name
         )
@@ -493,10 +471,17 @@ def process_scenario(study_id, scenario_id):
 @api_bp.route('/studies/<int:study_id>/scenarios/<int:scenario_id>/status', methods=['GET'])
 def get_scenario_status(study_id, scenario_id):
     """API Endpoint: Get the current status and file presence for a scenario."""
-    scenario = Scenario.query.filter_by(id=scenario_id, study_id=study_id).first()
-    if not scenario:
+    # Load the scenario together with its configuration name in a single query
+    row = db.session.execute(
+        select(Scenario, Configuration.name)
+        .outerjoin(Configuration, Scenario.configuration_id == Configuration.id)
+        .where(Scenario.id == scenario_id, Scenario.study_id == study_id)
+    ).first()
+    if row is None:
         return jsonify({"error": f"Scenario {scenario_id} not found for study {study_id}."}), 404
+    scenario, config_name = row
     try:
+        status, status_message = get_reported_status(scenario)
         # Helper functions for file size
         uploaded_files_info = [
             {
@@ -519,17 +504,16 @@ def get_scenario_status(study_id, scenario_id):
             }
         ]
 
-        # Get configuration name
-        config = db.session.get(Configuration, scenario.configuration_id)
-        config_name = config.name if config else "Unknown Configuration"
+        if config_name is None:
+            config_name = "Unknown Configuration"
         
         return jsonify({
             "id": scenario.id,
             "configuration_id": scenario.configuration_id,
             "configuration_name": config_name,
             "name": scenario.name,
-            "status": scenario.status.name,
-            "status_message": scenario.status_message,
+            "status": status.name,
+            "status_message": status_message,
             "uploaded_files": uploaded_files_info, # New list with detailed file info
             # Keep these for any part of the frontend still using them directly, though the new list is preferred
             "has_am_csv": bool(scenario.am_csv_path),
@@ -639,25 +623,24 @@ def delete_configuration(study_id, config_id):
                 total_uploads_folders_deleted += 1
             if folders_outputs_deleted:
                 total_outputs_folders_deleted += 1
-                
-            # Delete scenario from database
-            db.session.delete(scenario)
+
         
         # Delete configuration folders
         config_uploads_deleted, config_outputs_deleted = delete_configuration_folders(study_id, config_id)
 
-        # Then delete the configuration itself
-        db.session.delete(config)
+        # Then delete the rows: one bulk DELETE for all scenarios and one for the
+        # configuration, instead of a DELETE per scenario from the unit of work
+        db.session.execute(delete(Scenario).where(Scenario.configuration_id == config_id))
+        db.session.execute(delete(Configuration).where(Configuration.id == config_id))
         db.session.commit()
         
-        # Clean up any empty folders left behind
-        empty_uploads_removed, empty_outputs_removed = cleanup_all_empty_folders()
+        # Clean up any empty folders left behind, off the request thread
+        schedule_empty_folder_cleanup()
 
         logging.info(f"API: Deleted configuration {config_id} with {len(scenarios)} associated scenarios from study {study_id}")
         logging.info(f"API: Deleted {total_uploads_deleted} upload files and {total_outputs_deleted} output files")
         logging.info(f"API: Deleted {total_uploads_folders_deleted} scenario upload folders and {total_outputs_folders_deleted} scenario output folders")
         logging.info(f"API: Deleted configuration folders: uploads={config_uploads_deleted}, outputs={config_outputs_deleted}")
-        logging.info(f"API: Cleaned up {empty_uploads_removed} empty upload folders and {empty_outputs_removed} empty output folders")
         
         return jsonify({
             "message": f"Configuration '{config.name}' and {len(scenarios)} associated scenarios deleted successfully.",
@@ -666,7 +649,9 @@ def delete_configuration(study_id, config_id):
                 "outputs": total_outputs_deleted,
                 "scenario_folders": total_uploads_folders_deleted + total_outputs_folders_deleted,
                 "config_folders_deleted": config_uploads_deleted or config_outputs_deleted,
-                "empty_folders_removed": empty_uploads_removed + empty_outputs_removed
+                # Count of empty folders removed before responding; always 0 now that the
+                # empty-folder scan runs in the background after the response (kept as an int)
+                "empty_folders_removed": 0
             }
         }), 200
     except Exception as e:
@@ -701,13 +686,12 @@ def delete_scenario(study_id, scenario_id):
         db.session.delete(scenario)
         db.session.commit()
 
-        # Clean up any empty folders left behind
-        empty_uploads_removed, empty_outputs_removed = cleanup_all_empty_folders()
+        # Clean up any empty folders left behind, off the request thread
+        schedule_empty_folder_cleanup()
 
         logging.info(f"API: Deleted scenario {scenario_id} ('{scenario_name}') from study {study_id}")
         logging.info(f"API: Deleted {uploads_deleted} upload files and {outputs_deleted} output files")
         logging.info(f"API: Deleted scenario folders: uploads={folders_uploads_deleted}, outputs={folders_outputs_deleted}")
-        logging.info(f"API: Cleaned up {empty_uploads_removed} empty upload folders and {empty_outputs_removed} empty output folders")
         
         return jsonify({
             "message": f"Scenario '{scenario_name}' deleted successfully.",
@@ -717,7 +701,7 @@ def delete_scenario(study_id, scenario_id):
                 "outputs": outputs_deleted,
                 "uploads_folder": folders_uploads_deleted,
                 "outputs_folder": folders_outputs_deleted,
-                "empty_folders_removed": empty_uploads_removed + empty_outputs_removed
+                "empty_folders_removed": 0
             }
         }), 200
     except Exception as e:
@@ -785,8 +769,14 @@ def delete_study(study_id):
         total_outputs_deleted = 0
         configs_deleted = []
         
-        # Get all configurations for this study
-        configurations = Configuration.query.filter_by(study_id=study_id).all()
+        # Get all configurations for this study, loading every configuration's
+        # scenarios in one extra query instead of one query per configuration
+        configurations = (
+            Configuration.query
+            .filter_by(study_id=study_id)
+            .options(selectinload(Configuration.scenarios))
+            .all()
+        )
         total_configs = len(configurations)
 
         # Process each configuration
@@ -794,8 +784,7 @@ def delete_study(study_id):
             config_id = config.id
             configs_deleted.append(config_id)
             
-            # Get all scenarios for this configuration
-            scenarios = Scenario.query.filter_by(configuration_id=config_id).all()
+            scenarios = config.scenarios
             total_scenarios += len(scenarios)
             
             # Delete each scenario's files
@@ -807,31 +796,27 @@ def delete_study(study_id):
                 
                 # Delete scenario folders
                 delete_scenario_folders(study_id, scenario.id)
-                
-                # Now delete the scenario from DB
-                db.session.delete(scenario)
             
             # Delete configuration folder
             delete_configuration_folders(study_id, config_id)
-            
-            # Delete configuration from DB
-            db.session.delete(config)
         
         # Delete study folders
         study_uploads_deleted, study_outputs_deleted = delete_study_folders(study_id)
         
-        # Finally, delete the study itself
+        # Finally, delete the rows with one bulk DELETE per table (children first)
+        # instead of a DELETE per scenario and configuration
         study_name = study.name
-        db.session.delete(study)
+        db.session.execute(delete(Scenario).where(Scenario.study_id == study_id))
+        db.session.execute(delete(Configuration).where(Configuration.study_id == study_id))
+        db.session.execute(delete(Study).where(Study.id == study_id))
         db.session.commit()
         
-        # Clean up any empty folders left behind
-        empty_uploads_removed, empty_outputs_removed = cleanup_all_empty_folders()
+        # Clean up any empty folders left behind, off the request thread
+        schedule_empty_folder_cleanup()
 
         logging.info(f"API: Deleted study {study_id} ('{study_name}') with {total_configs} configurations and {total_scenarios} scenarios")
         logging.info(f"API: Deleted {total_uploads_deleted} upload files and {total_outputs_deleted} output files")
         logging.info(f"API: Deleted study folders: uploads={study_uploads_deleted}, outputs={study_outputs_deleted}")
-        logging.info(f"API: Cleaned up {empty_uploads_removed} empty upload folders and {empty_outputs_removed} empty output folders")
         
         return jsonify({
             "message": f"Study '{study_name}' deleted successfully with {total_configs} configurations and {total_scenarios} scenarios.",
@@ -840,7 +825,7 @@ def delete_study(study_id):
                 "outputs": total_outputs_deleted,
                 "study_folders_deleted": study_uploads_deleted or study_outputs_deleted,
                 "configurations_deleted": configs_deleted,
-                "empty_folders_removed": empty_uploads_removed + empty_outputs_removed
+                "empty_folders_removed": 0
             }
         }), 200
     except Exception as e:
@@ -877,10 +862,10 @@ def delete_scenario_file_typed(study_id, scenario_id, file_type_id):
     else:
         try:
             file_path_absolute = get_absolute_path(file_path_relative)
-            if os.path.exists(file_path_absolute):
-                os.remove(file_path_absolute)
+            try:
+                os.unlink(file_path_absolute)
                 logging.info(f"API: Successfully deleted physical file: {file_path_absolute}")
-            else:
+            except FileNotFoundError:
                 logging.warning(f"API: DB path '{file_path_relative}' existed for {file_type_id} of scenario {scenario_id}, but file not on disk at '{file_path_absolute}'.")
             
             # Clear DB fields for this file type
@@ -895,20 +880,14 @@ def delete_scenario_file_typed(study_id, scenario_id, file_type_id):
 
     # Update scenario status - if it was READY, it might now be PENDING_FILES
     # Don't change if it's PENDING_CONFIG, PROCESSING, or already ERROR/COMPLETE (unless specific logic dictates)
-    if not all([scenario.am_csv_path, scenario.pm_csv_path, scenario.attout_txt_path]):
+    if not scenario.has_all_input_files:
         if scenario.status == ProcessingStatus.READY_TO_PROCESS or scenario.status == ProcessingStatus.COMPLETE:
             scenario.status = ProcessingStatus.PENDING_FILES
             scenario.status_message = "One or more required files are now missing after deletion."
             logging.info(f"API: Scenario {scenario_id} status updated to PENDING_FILES due to file deletion.")
     
-    try:
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        logging.exception(f"API: Database error committing changes after file deletion for scenario {scenario_id}: {e}")
-        return jsonify({"error": f"Database error after file deletion: {str(e)}"}), 500
-
-    # Return the updated scenario status
+    # Build the updated scenario status before committing; the in-memory scenario
+    # already holds the new values, and commit would expire it and force a reload
     updated_uploaded_files_info = [
         {
             "file_type_id": "am_csv", 
@@ -929,7 +908,7 @@ def delete_scenario_file_typed(study_id, scenario_id, file_type_id):
             "is_uploaded": bool(scenario.attout_txt_path)
         }
     ]
-    return jsonify({
+    response_data = {
         "message": f"File type '{file_type_id}' processed for deletion successfully.",
         "scenario_id": scenario.id,
         "name": scenario.name,
@@ -941,4 +920,16 @@ def delete_scenario_file_typed(study_id, scenario_id, file_type_id):
         "has_attout": bool(scenario.attout_txt_path),
         "has_merged": bool(scenario.merged_csv_path),
         "has_attin": bool(scenario.attin_txt_path)
-    }), 200
\ No newline at end of file
+    }
+
+    # The cleared path/name columns and any status change go out as a single UPDATE.
+    # A repeated delete of an already-cleared file changes nothing; skip the commit then
+    if db.session.is_modified(scenario):
+        try:
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logging.exception(f"API: Database error committing changes after file deletion for scenario {scenario_id}: {e}")
+            return jsonify({"error": f"Database error after file deletion: {str(e)}"}), 500
+
+    return jsonify(response_data), 200
\ No newline at end of file
@@ -5,6 +5,7 @@ from ..utils import allowed_file # Import from local utils
 from ..extensions import db # Needed for direct DB query for study name
 from ..models import Study, Configuration # Needed for direct DB queries
 from .. import api_client # Import our new API client module
+from ..cache import invalidate_read_cache
 
 frontend_bp = Blueprint('frontend', __name__)
 
@@ -23,6 +24,12 @@ def _jinja2_filter_datetime(date_str, fmt=None):
         logging.error(f"Error formatting date {date_str}: {e}")
         return date_str
 
+def _to_naive_datetime(value):
+    """Return a study date as a naive datetime, parsing ISO strings if needed."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return value.replace(tzinfo=None)
+
 # --- Frontend Routes ---
 
 @frontend_bp.route('/study/<int:study_id>/delete-confirm')
@@ -504,6 +511,8 @@ def process_scenario_frontend(study_id, scenario_id):
             # Check for ATTIN path as sign of success
             if data.get('attin_txt_path'):
                 logging.info('Processing completed successfully! ATTIN file generated.')
+            elif data.get('status') == 'PROCESSING':
+                logging.info('Processing started in the background.')
             else:
                 # This case shouldn't happen if API returns 200 correctly
                 logging.warning(f"Frontend: API returned success but missing 'attin_txt_path' in response JSON")
@@ -820,7 +829,7 @@ def edit_study_post(study_id):
                 cutoff_date = datetime.now() - timedelta(days=days)
                 studies = [
                     study for study in studies 
-                    if datetime.fromisoformat(study['created_at'].replace('Z', '+00:00')).replace(tzinfo=None) >= cutoff_date
+                    if _to_naive_datetime(study['created_at']) >= cutoff_date
                 ]
             except (KeyError, Exception) as e:
                 logging.warning(f"Error parsing study date: {e}")
@@ -929,6 +938,7 @@ def reorder_scenarios(study_id, config_id):
                 logging.info(f"Updated scenario {scenario_id} order to {index}")
         
         db.session.commit()
+        invalidate_read_cache()
         logging.info("Scenario reordering completed successfully")
         
         # Fetch updated scenarios and return the updated list for HTMX
@@ -1,14 +1,14 @@
 import os
 import logging
+from functools import lru_cache
 from flask import current_app
 from werkzeug.utils import secure_filename
-import cloudinary
-import cloudinary.uploader
-from cloudinary.utils import cloudinary_url
 
 def init_cloudinary():
     """Initialize Cloudinary configuration"""
     if current_app.config.get('USE_CLOUDINARY'):
+        # Imported here so workers that never touch Cloudinary don't load the SDK at boot
+        import cloudinary
         cloudinary.config(
             cloud_name=current_app.config['CLOUDINARY_CLOUD_NAME'],
             api_key=current_app.config['CLOUDINARY_API_KEY'],
@@ -16,6 +16,12 @@ def init_cloudinary():
         )
         logging.info("Cloudinary initialized")
 
+@lru_cache(maxsize=1)
+def _ensure_cloudinary():
+    """Configure Cloudinary on first use instead of at app startup"""
+    init_cloudinary()
+    return True
+
 def upload_file(file, folder="uploads"):
     """Upload file to Cloudinary or local storage"""
     if not file or file.filename == '':
@@ -25,6 +31,8 @@ def upload_file(file, folder="uploads"):
     
     if current_app.config.get('USE_CLOUDINARY'):
         try:
+            _ensure_cloudinary()
+            import cloudinary.uploader
             # Upload to Cloudinary
             result = cloudinary.uploader.upload(
                 file,
@@ -56,6 +64,8 @@ def delete_file(file_url_or_path):
     """Delete file from Cloudinary or local storage"""
     if current_app.config.get('USE_CLOUDINARY') and file_url_or_path.startswith('http'):
         try:
+            _ensure_cloudinary()
+            import cloudinary.uploader
             # Extract public_id from Cloudinary URL
             public_id = file_url_or_path.split('/')[-1].split('.')[0]
             cloudinary.uploader.destroy(public_id, resource_type="raw")
@@ -66,8 +76,9 @@ def delete_file(file_url_or_path):
     else:
         # Local file deletion
         try:
-            if os.path.exists(file_url_or_path):
-                os.remove(file_url_or_path)
+            os.unlink(file_url_or_path)
+            return True
+        except FileNotFoundError:
             return True
         except Exception as e:
             logging.error(f"Local file delete failed: {e}")
@@ -1,7 +1,12 @@
+import io
+import logging
 import os
 import shutil
+import threading
+from datetime import datetime, timedelta
 from flask import current_app
 from werkzeug.utils import secure_filename
+from .background import run_debounced, run_in_background, run_in_process_pool
 
 def allowed_file(filename):
     """Checks if the filename has an allowed extension."""
@@ -79,6 +84,108 @@ def get_relative_path(absolute_path):
     base_dir = current_app.config['BASE_DIR']
     return os.path.relpath(absolute_path, base_dir)
 
+# Boolean configuration options; only a JSON true turns one on
+CONFIGURATION_FLAGS = ('include_bg_dist', 'include_bg_assign', 'include_trip_dist', 'include_trip_assign')
+
+def _count_or_default(value, default=1):
+    """Returns value as an int >= 1, or default if it is missing or invalid."""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    return value if value >= 1 else default
+
+def parse_configuration_request(data):
+    """Validates a configure-study request body in one pass.
+
+    Returns:
+        tuple: (fields, error_message) - fields holds the Configuration column
+        values (name, phases_n, flags and trip counts); it is None on error
+    """
+    if not data or 'phases_n' not in data or 'config_name' not in data:
+        return None, "'phases_n' and 'config_name' required"
+
+    try:
+        phases_n = int(data['phases_n'])
+    except (TypeError, ValueError):
+        phases_n = -1
+    if phases_n < 0:
+        return None, "Invalid 'phases_n', must be a non-negative integer."
+
+    config_name = data['config_name'].strip() if isinstance(data['config_name'], str) else ''
+    if not config_name:
+        return None, "'config_name' cannot be empty"
+
+    fields = {'name': config_name, 'phases_n': phases_n}
+    fields.update((flag, data.get(flag, False) is True) for flag in CONFIGURATION_FLAGS)
+    # Counts only apply when their scenario type is included
+    fields['trip_dist_count'] = _count_or_default(data.get('trip_dist_count')) if fields['include_trip_dist'] else 1
+    fields['trip_assign_count'] = _count_or_default(data.get('trip_assign_count')) if fields['include_trip_assign'] else 1
+    return fields, None
+
+def build_scenario_names(phases_n, incl, trip_dist_count=1, trip_assign_count=1):
+    """Returns the scenario names of a configuration in creation order.
+
+    The per-phase templates are resolved once from the include flags, so each
+    phase is just a format() over the same table.
+    """
+    templates = ['No_Build_Phase_{i}', 'Build_Phase_{i}']
+    if incl['include_bg_dist']: templates.append('BG_Dev_Distribution_Phase_{i}')
+    if incl['include_bg_assign']: templates.append('BG_Dev_Assignment_Phase_{i}')
+
+    # A single trip distribution/assignment scenario gets no number suffix
+    if incl['include_trip_dist']:
+        if trip_dist_count == 1:
+            templates.append('Trip_Distribution_Phase_{i}')
+        else:
+            templates.extend(f'Trip_Distribution_{j}_Phase_{{i}}' for j in range(1, trip_dist_count + 1))
+    if incl['include_trip_assign']:
+        if trip_assign_count == 1:
+            templates.append('Trip_Assignment_Phase_{i}')
+        else:
+            templates.extend(f'Trip_Assignment_{j}_Phase_{{i}}' for j in range(1, trip_assign_count + 1))
+
+    return ['Existing'] + [t.format(i=i) for i in range(1, phases_n + 1) for t in templates]
+
+# Chunk size used when streaming uploads to disk
+UPLOAD_COPY_BUFSIZE = 1 << 20
+
+def _copy_upload_stream(src, dst):
+    """Copy an upload stream into an open file.
+
+    Werkzeug spools larger uploads to a temporary file; those are copied
+    kernel-side with os.sendfile. In-memory streams (small uploads) and
+    platforms without sendfile fall back to shutil.copyfileobj.
+    """
+    if hasattr(os, 'sendfile'):
+        try:
+            src_fd = src.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            src_fd = None
+        if src_fd is not None:
+            # The stream is buffered, so continue from its logical position
+            offset = src.tell()
+            try:
+                while True:
+                    sent = os.sendfile(dst.fileno(), src_fd, offset, UPLOAD_COPY_BUFSIZE)
+                    if not sent:
+                        return
+                    offset += sent
+            except OSError:
+                # e.g. a filesystem that does not support sendfile; resume in Python
+                src.seek(offset)
+                dst.seek(0, os.SEEK_END)
+    shutil.copyfileobj(src, dst, UPLOAD_COPY_BUFSIZE)
+
+def _upload_semaphore():
+    """Semaphore bounding this process's concurrent upload writes to MAX_CONCURRENT_UPLOADS."""
+    semaphore = current_app.extensions.get('upload_semaphore')
+    if semaphore is None:
+        semaphore = current_app.extensions.setdefault(
+            'upload_semaphore', threading.BoundedSemaphore(current_app.config['MAX_CONCURRENT_UPLOADS'])
+        )
+    return semaphore
+
 def save_uploaded_file(file, study_id, scenario_id, file_type):
     """Save an uploaded file and return the relative path.
 
@@ -102,12 +209,62 @@ def save_uploaded_file(file, study_id, scenario_id, file_type):
     # Full path to save the file
     save_path = os.path.join(upload_dir, filename)
 
-    # Save the file
-    file.save(save_path)
+    # Stream the upload to disk in large chunks rather than FileStorage.save's 16 KiB;
+    # past MAX_CONCURRENT_UPLOADS, further uploads wait here instead of competing for the disk
+    with _upload_semaphore(), open(save_path, 'wb') as dst:
+        _copy_upload_stream(file.stream, dst)
 
     # Return the path relative to BASE_DIR
     return get_relative_path(save_path), filename
 
+def find_missing_files(file_paths):
+    """Return the paths in file_paths that do not exist on disk.
+
+    Each distinct parent directory is listed once with os.scandir, rather
+    than stat()ing every file separately (a scenario's inputs share a folder).
+    """
+    names_by_dir = {}
+    missing = []
+    for file_path in file_paths:
+        dir_path, name = os.path.split(file_path)
+        if dir_path not in names_by_dir:
+            try:
+                with os.scandir(dir_path) as entries:
+                    names_by_dir[dir_path] = {entry.name for entry in entries}
+            except OSError:
+                # A missing or unreadable folder has no usable files, as with os.path.exists
+                names_by_dir[dir_path] = set()
+        if name not in names_by_dir[dir_path]:
+            missing.append(file_path)
+    return missing
+
+def claim_scenario_for_processing(scenario):
+    """Atomically move a scenario to PROCESSING unless another request already has.
+
+    The status check done by the caller reads the row before it is written, so
+    two concurrent process requests could both pass it; this UPDATE only
+    matches while the status is not PROCESSING, and the database lets just one
+    of them through. Returns False when the scenario was already claimed. The
+    caller commits the claim straight away, before any processing starts.
+    """
+    from sqlalchemy import update
+    from .extensions import db
+    from .models import Scenario, ProcessingStatus
+
+    result = db.session.execute(
+        update(Scenario)
+        .where(Scenario.id == scenario.id, Scenario.status != ProcessingStatus.PROCESSING)
+        .values(
+            status=ProcessingStatus.PROCESSING,
+            processing_started_at=datetime.utcnow(),
+            status_message="Processing started...",
+            # Clear previous output paths immediately
+            merged_csv_path=None,
+            attin_txt_path=None,
+        )
+    )
+    return result.rowcount == 1
+
 def validate_file_extension(file, file_type):
     """Validate that the file has the correct extension for its type.
 
@@ -182,15 +339,33 @@ def delete_file_if_exists(file_path):
     Returns:
         bool: True if file was deleted, False if it didn't exist
     """
+    if not file_path:
+        return False
     try:
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
-            return True
+        os.unlink(file_path)
+        return True
+    except FileNotFoundError:
         return False
     except Exception as e:
         current_app.logger.error(f"Error deleting file '{file_path}': {str(e)}")
         return False
 
+def _unlink_replaced_file(file_path):
+    """Unlink a replaced upload; runs on the background pool, without an app context."""
+    try:
+        os.unlink(file_path)
+        logging.info(f"Deleted replaced file '{file_path}'")
+    except FileNotFoundError:
+        pass
+
+def delete_replaced_file_later(old_path, new_path):
+    """Delete a file that an upload replaced, off the request thread.
+
+    Nothing is deleted when the upload was saved under the same path.
+    """
+    if old_path and old_path != new_path:
+        run_in_background(_unlink_replaced_file, old_path)
+
 def delete_folder_if_exists(folder_path):
     """Delete a folder and all its contents if it exists.
     
@@ -200,15 +375,65 @@ def delete_folder_if_exists(folder_path):
     Returns:
         bool: True if folder was deleted, False if it didn't exist
     """
+    if not folder_path:
+        return False
     try:
-        if folder_path and os.path.exists(folder_path):
-            shutil.rmtree(folder_path)
-            return True
+        shutil.rmtree(folder_path)
+        return True
+    except FileNotFoundError:
         return False
     except Exception as e:
         current_app.logger.error(f"Error deleting folder '{folder_path}': {str(e)}")
         return False
 
+def unlink_files(file_paths, base_dir=None):
+    """Delete a batch of files, skipping empty and missing paths.
+
+    Files are grouped by directory and removed with unlinkat() against one
+    open directory descriptor, so each parent directory is resolved once
+    per batch instead of once per file. With base_dir, file_paths are
+    relative to it (e.g. paths as stored on a Scenario).
+
+    Returns:
+        int: Number of files deleted
+    """
+    files_by_dir = {}
+    for file_path in file_paths:
+        if file_path:
+            files_by_dir.setdefault(os.path.dirname(file_path), []).append(os.path.basename(file_path))
+
+    deleted = 0
+    for dir_path, names in files_by_dir.items():
+        if base_dir:
+            # Join the base once per directory rather than once per file
+            dir_path = os.path.join(base_dir, dir_path)
+        dir_fd = None
+        if os.unlink in os.supports_dir_fd:
+            try:
+                dir_fd = os.open(dir_path, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+            except FileNotFoundError:
+                # Nothing left to delete in a directory that is gone
+                continue
+            except OSError as e:
+                current_app.logger.error(f"Error opening folder '{dir_path}': {str(e)}")
+                continue
+        try:
+            for name in names:
+                try:
+                    if dir_fd is None:
+                        os.unlink(os.path.join(dir_path, name))
+                    else:
+                        os.unlink(name, dir_fd=dir_fd)
+                    deleted += 1
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    current_app.logger.error(f"Error deleting file '{os.path.join(dir_path, name)}': {str(e)}")
+        finally:
+            if dir_fd is not None:
+                os.close(dir_fd)
+    return deleted
+
 def delete_scenario_files(scenario, delete_uploads=True, delete_outputs=True):
     """Delete all files associated with a scenario.
     
@@ -225,22 +450,20 @@ def delete_scenario_files(scenario, delete_uploads=True, delete_outputs=True):
     
     try:
         # Delete uploaded files if requested
+        # Stored paths are relative to BASE_DIR; unlink_files resolves them per directory
+        base_dir = current_app.config['BASE_DIR']
         if delete_uploads:
-            for file_attr in ['am_csv_path', 'pm_csv_path', 'attout_txt_path']:
-                file_path = getattr(scenario, file_attr)
-                if file_path:
-                    abs_path = get_absolute_path(file_path)
-                    if delete_file_if_exists(abs_path):
-                        uploads_deleted += 1
+            uploads_deleted = unlink_files([
+                getattr(scenario, file_attr)
+                for file_attr in ['am_csv_path', 'pm_csv_path', 'attout_txt_path']
+            ], base_dir=base_dir)
         
         # Delete output files if requested
         if delete_outputs:
-            for file_attr in ['merged_csv_path', 'attin_txt_path']:
-                file_path = getattr(scenario, file_attr)
-                if file_path:
-                    abs_path = get_absolute_path(file_path)
-                    if delete_file_if_exists(abs_path):
-                        outputs_deleted += 1
+            outputs_deleted = unlink_files([
+                getattr(scenario, file_attr)
+                for file_attr in ['merged_csv_path', 'attin_txt_path']
+            ], base_dir=base_dir)
     
     except Exception as e:
         current_app.logger.error(f"Error deleting scenario files: {str(e)}")
@@ -372,6 +595,11 @@ def delete_study_folders(study_id, delete_uploads=True, delete_outputs=True):
         
     return uploads_deleted, outputs_deleted
 
+def _is_empty_dir(path):
+    """Check whether a directory has no entries, stopping at the first one found."""
+    with os.scandir(path) as entries:
+        return next(entries, None) is None
+
 def cleanup_empty_folders(base_folder):
     """Recursively remove empty folders under the base folder.
     
@@ -394,7 +622,7 @@ def cleanup_empty_folders(base_folder):
                 continue
                 
             # If the directory is empty (no files and no non-empty dirs)
-            if not files and not os.listdir(root):
+            if not files and _is_empty_dir(root):
                 os.rmdir(root)
                 removed_count += 1
                 current_app.logger.info(f"Removed empty folder: {root}")
@@ -425,4 +653,140 @@ def cleanup_all_empty_folders():
     except Exception as e:
         current_app.logger.error(f"Error in cleanup_all_empty_folders: {str(e)}")
         
-    return uploads_count, outputs_count
\ No newline at end of file
+    return uploads_count, outputs_count
+
+# Seconds to wait for further deletes before scanning for empty folders
+EMPTY_FOLDER_CLEANUP_DELAY = 0.5
+
+def _cleanup_all_empty_folders_in(app):
+    """Background entry point: runs cleanup_all_empty_folders inside app's context."""
+    with app.app_context():
+        uploads_count, outputs_count = cleanup_all_empty_folders()
+        app.logger.info(f"Cleaned up {uploads_count} empty upload folders and {outputs_count} empty output folders")
+
+def schedule_empty_folder_cleanup():
+    """Run cleanup_all_empty_folders in the background after a delete.
+
+    Deletes that arrive within EMPTY_FOLDER_CLEANUP_DELAY of each other share
+    a single scan of the upload and output trees.
+    """
+    app = current_app._get_current_object()
+    key = ('cleanup_empty_folders', app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER'])
+    run_debounced(key, EMPTY_FOLDER_CLEANUP_DELAY, _cleanup_all_empty_folders_in, app)
+
+STALE_PROCESSING_MESSAGE = "Processing did not finish (the worker running it stopped). Please process again."
+
+def is_processing_stale(scenario):
+    """Check whether a scenario has been in PROCESSING for longer than PROCESSING_TIMEOUT."""
+    from .models import ProcessingStatus
+
+    if scenario.status != ProcessingStatus.PROCESSING:
+        return False
+    started_at = scenario.processing_started_at
+    # Runs started before processing_started_at existed have no start time; they are long gone
+    if started_at is None:
+        return True
+    timeout = timedelta(seconds=current_app.config.get('PROCESSING_TIMEOUT', 1800))
+    return datetime.utcnow() - started_at >= timeout
+
+def get_reported_status(scenario):
+    """Return the (status, status_message) to show for a scenario.
+
+    A stale PROCESSING run is reported as ERROR without writing anything, so
+    status reads stay read-only; the change is stored when the scenario is
+    next processed (see fail_stale_processing).
+    """
+    from .models import ProcessingStatus
+
+    if is_processing_stale(scenario):
+        return ProcessingStatus.ERROR, STALE_PROCESSING_MESSAGE
+    return scenario.status, scenario.status_message
+
+def fail_stale_processing(scenario):
+    """Move a scenario stuck in PROCESSING to ERROR once PROCESSING_TIMEOUT has passed.
+
+    A processing run records its result from the worker that started it; if
+    that worker dies (crash, restart) nothing else would. Returns True when
+    the scenario was changed, leaving the commit to the caller.
+    """
+    from .models import ProcessingStatus
+
+    if not is_processing_stale(scenario):
+        return False
+    scenario.status = ProcessingStatus.ERROR
+    scenario.status_message = STALE_PROCESSING_MESSAGE
+    current_app.logger.warning(f"Scenario {scenario.id} was stuck in PROCESSING since {scenario.processing_started_at}; marked as ERROR")
+    return True
+
+def _record_processing_result(app, study_id, scenario_id, started_at, future):
+    """Store the outcome of a background processing run on its scenario.
+
+    The result is only written while the scenario is still PROCESSING from
+    this run (same processing_started_at). A run that outlived
+    PROCESSING_TIMEOUT may have been marked ERROR and processed again since;
+    its late result must not overwrite the newer run's state.
+    """
+    from sqlalchemy import update
+    from .cache import invalidate_read_cache
+    from .extensions import db
+    from .models import Scenario, ProcessingStatus
+
+    with app.app_context():
+        try:
+            merged_path_abs, attin_path_abs = future.result()
+            values = {
+                'merged_csv_path': get_relative_path(merged_path_abs),
+                'attin_txt_path': get_relative_path(attin_path_abs),
+                'status': ProcessingStatus.COMPLETE,
+                'status_message': "Processing completed successfully.",
+            }
+        except Exception as e:
+            # Be careful about error message length for status_message column
+            error_msg = f"Processing failed: {str(e)}"
+            values = {
+                'merged_csv_path': None,
+                'attin_txt_path': None,
+                'status': ProcessingStatus.ERROR,
+                'status_message': (error_msg[:250] + '...') if len(error_msg) > 253 else error_msg,
+            }
+            app.logger.error(f"Background processing failed for scenario {scenario_id} (Study {study_id}): {e}")
+        try:
+            result = db.session.execute(
+                update(Scenario)
+                .where(
+                    Scenario.id == scenario_id,
+                    Scenario.status == ProcessingStatus.PROCESSING,
+                    Scenario.processing_started_at == started_at,
+                )
+                .values(**values)
+            )
+            db.session.commit()
+        except Exception as commit_e:
+            db.session.rollback()
+            app.logger.error(f"CRITICAL - Failed to commit processing result for scenario {scenario_id}. DB error: {commit_e}")
+            return
+        if result.rowcount == 0:
+            app.logger.warning(
+                f"Discarded the result of the processing run of scenario {scenario_id} started at {started_at}: "
+                f"the scenario was deleted or processed again since"
+            )
+            return
+        if values['status'] == ProcessingStatus.COMPLETE:
+            app.logger.info(f"Successfully processed scenario {scenario_id} (Study {study_id}) in the background")
+        invalidate_read_cache()
+
+def start_background_processing(study_id, scenario_id, started_at, am_path, pm_path, attout_path, output_dir, scenario_name):
+    """Run process_traffic_data for a scenario in a worker process.
+
+    The scenario must already be committed as PROCESSING, with started_at as
+    its processing_started_at. When the run finishes, its status is set to
+    COMPLETE (with the output paths) or ERROR.
+    """
+    from traffic_app.processing import process_traffic_data
+
+    app = current_app._get_current_object()
+    future = run_in_process_pool(process_traffic_data, am_path, pm_path, attout_path, output_dir, scenario_name)
+    # Done-callbacks run on the process pool's management thread; move the DB write off it
+    future.add_done_callback(
+        lambda f: run_in_background(_record_processing_result, app, study_id, scenario_id, started_at, f)
+    )